@@ -0,0 +1,224 @@
+"""Профилировщик слотов и детектор зависаний цикла событий для всех лабораторных.
+
+Включается переменной окружения, без неё приложения его даже не импортируют:
+
+    GUI_PROFILE=trace.json python GUI_3.py
+    GUI_PROFILE_STALL_MS=50 - порог зависания GUI-потока (по умолчанию 100 мс)
+
+Методы указанных классов оборачиваются до создания окон, поэтому подключённые
+к сигналам слоты, переопределённые обработчики событий и слоты, вызываемые из
+QML, пишут свою длительность. Таймер-пульс в GUI-потоке и сторожевой поток
+замечают зависания цикла событий и сохраняют стек GUI-потока в момент зависания.
+При выходе пишется JSON в формате Chrome trace events (chrome://tracing, Perfetto).
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import inspect
+import functools
+import threading
+import traceback
+
+PROFILE_ENV_VAR = "GUI_PROFILE"
+STALL_ENV_VAR = "GUI_PROFILE_STALL_MS"
+DEFAULT_STALL_MS = 100
+# Период таймера-пульса в GUI-потоке
+HEARTBEAT_MS = 20
+# Ограничение числа событий в памяти (остальные только считаются)
+MAX_EVENTS = 500000
+
+
+def _qt_core():
+    """QtCore той привязки, которую уже импортировало приложение (PyQt6 или PyQt5)"""
+    if "PyQt6" in sys.modules:
+        from PyQt6 import QtCore
+    else:
+        from PyQt5 import QtCore
+    return QtCore
+
+
+def _positional_limit(func):
+    """Сколько позиционных аргументов принимает функция (None - без ограничения).
+
+    PyQt отбрасывает лишние аргументы сигнала, глядя на сигнатуру слота; обёртка
+    с *args этого не позволяет, поэтому обрезаем аргументы сами.
+    """
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(1 for p in parameters
+               if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD))
+
+
+class GuiProfiler:
+    def __init__(self, trace_path, stall_ms=DEFAULT_STALL_MS):
+        self.trace_path = trace_path
+        self.stall_ms = stall_ms
+        self.events = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._main_thread = threading.get_ident()
+        self._active = []          # стек выполняемых слотов GUI-потока
+        self._last_beat = None
+        self._stall_stack = None
+        self._stall_slots = None
+        self._heartbeat = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+        self._written = False
+
+    # --- Слоты ---
+    def wrap_class(self, cls):
+        """Оборачивает методы, объявленные в самом классе (кроме служебных __x__).
+
+        Слоты с @pyqtSlot PyQt регистрирует в метаобъекте при создании класса, и QML
+        вызывает их в обход атрибутов класса. Для таких классов создаётся подкласс
+        с обёрнутыми слотами, который подменяет исходный класс в его модуле.
+        """
+        slots = {}
+        for name, func in list(vars(cls).items()):
+            if name.startswith("__") or not inspect.isfunction(func):
+                continue
+            wrapper = self._wrap(f"{cls.__name__}.{name}", func)
+            setattr(cls, name, wrapper)
+            if hasattr(func, "__pyqtSignature__"):
+                slots[name] = wrapper
+        if not slots:
+            return cls
+        profiled = type(cls)(cls.__name__, (cls,), dict(slots, __module__=cls.__module__))
+        module = sys.modules.get(cls.__module__)
+        if module is not None and getattr(module, cls.__name__, None) is cls:
+            setattr(module, cls.__name__, profiled)
+        return profiled
+
+    def _wrap(self, name, func):
+        limit = _positional_limit(func)
+        profiler = self
+
+        # functools.wraps переносит и атрибуты pyqtSlot, так что слот остаётся видимым для QML
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if limit is not None:
+                args = args[:limit]
+            on_main = threading.get_ident() == profiler._main_thread
+            if on_main:
+                profiler._active.append(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                if on_main:
+                    profiler._active.pop()
+                profiler._record(name, "slot", start, end)
+        return wrapper
+
+    def _record(self, name, category, start, end, args=None):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append(event)
+            else:
+                self.dropped += 1
+
+    # --- Зависания цикла событий ---
+    def start(self):
+        """Запуск пульса и сторожевого потока; вызывается после создания QApplication"""
+        QtCore = _qt_core()
+        self._main_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat = QtCore.QTimer()
+        self._heartbeat.setInterval(HEARTBEAT_MS)
+        self._heartbeat.timeout.connect(self._beat)
+        self._heartbeat.start()
+        self._watchdog = threading.Thread(target=self._watch, name="gui-profiler-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def _beat(self):
+        now = time.perf_counter()
+        if (now - self._last_beat) * 1000 > self.stall_ms + HEARTBEAT_MS:
+            args = {"stack": self._stall_stack or "", "slots": self._stall_slots or []}
+            self._record("event loop stall", "stall", self._last_beat, now, args)
+        self._last_beat = now
+        self._stall_stack = None
+        self._stall_slots = None
+
+    def _watch(self):
+        threshold = (self.stall_ms + HEARTBEAT_MS) / 1000
+        interval = max(0.005, self.stall_ms / 4000)
+        while not self._stopping.wait(interval):
+            if self._stall_stack is not None or time.perf_counter() - self._last_beat <= threshold:
+                continue
+            # Стек GUI-потока в момент зависания: видно, какой обработчик держит цикл событий
+            frame = sys._current_frames().get(self._main_thread)
+            if frame is not None:
+                self._stall_slots = list(self._active)
+                self._stall_stack = "".join(traceback.format_stack(frame))
+
+    # --- Результаты ---
+    def summary(self, top=10):
+        """Слоты с наибольшим суммарным временем: (имя, вызовы, сумма мс, максимум мс)"""
+        totals = {}
+        with self._lock:
+            events = [e for e in self.events if e["cat"] == "slot"]
+        for event in events:
+            calls, total, longest = totals.get(event["name"], (0, 0.0, 0.0))
+            totals[event["name"]] = (calls + 1, total + event["dur"] / 1000, max(longest, event["dur"] / 1000))
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return [(name, calls, total, longest) for name, (calls, total, longest) in ranked]
+
+    def write(self):
+        """Запись trace-файла (один раз, при выходе из программы)"""
+        if self._written:
+            return
+        self._written = True
+        self._stopping.set()
+        with self._lock:
+            events = list(self.events)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": self._main_thread,
+                     "args": {"name": "GUI"}}]
+        with open(self.trace_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                       "otherData": {"stall_ms": self.stall_ms, "dropped_events": self.dropped}}, f)
+
+        stalls = sum(1 for event in events if event["cat"] == "stall")
+        print(f"Профиль записан в {self.trace_path}: событий {len(events)}, зависаний {stalls}", file=sys.stderr)
+        for name, calls, total, longest in self.summary():
+            print(f"  {name:45} вызовов={calls:6d} всего={total:9.1f} мс макс={longest:8.1f} мс", file=sys.stderr)
+
+
+def install_from_env(*classes):
+    """Включение профилировщика, если задана GUI_PROFILE; иначе None.
+
+    Вызывается до создания окон (слоты оборачиваются на уровне классов);
+    после создания QApplication нужно вызвать start() у результата.
+    """
+    trace_path = os.environ.get(PROFILE_ENV_VAR)
+    if not trace_path:
+        return None
+    try:
+        stall_ms = float(os.environ.get(STALL_ENV_VAR, DEFAULT_STALL_MS))
+    except ValueError:
+        stall_ms = DEFAULT_STALL_MS
+    profiler = GuiProfiler(trace_path, stall_ms)
+    for cls in classes:
+        profiler.wrap_class(cls)
+    atexit.register(profiler.write)
+    return profiler
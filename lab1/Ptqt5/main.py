@@ -1,11 +1,39 @@
-from PyQt6 import uic
+import os
+import time
+
+START_TIME = time.perf_counter()
+
+from PyQt6.QtCore import QObject, QEvent
 from PyQt6.QtWidgets import QApplication
 
-Form, Window = uic.loadUiType("pyqt5.ui")
+from ui_cache import load_ui_type
+
+# Форма компилируется из pyqt5.ui только при первом запуске (или после её изменения)
+Form, Window = load_ui_type(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pyqt5.ui"))
+ui_loaded = time.perf_counter()
+
+
+class FirstPaintReporter(QObject):
+    """Время до первого окна - момент первой отрисовки окна (как first_paint в lab2)"""
+
+    def __init__(self, widget):
+        super().__init__()
+        self._widget = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self._widget and event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            now = time.perf_counter()
+            print(f"Загрузка формы: {(ui_loaded - START_TIME) * 1000:.1f} мс, "
+                  f"время до первого окна: {(now - START_TIME) * 1000:.1f} мс")
+        return False
+
 
 app = QApplication([])
 window = Window()
 form = Form()
 form.setupUi(window)
+first_paint = FirstPaintReporter(window)
 window.show()
-app.exec()
\ No newline at end of file
+app.exec()
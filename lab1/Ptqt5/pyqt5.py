@@ -6,6 +6,9 @@
 # run again.  Do not edit this file unless you know what you are doing.
 
 
+import os
+from collections import OrderedDict
+
 from PyQt6 import QtCore, QtGui, QtWidgets
 
 
@@ -55,6 +58,14 @@ class Ui_MainWindow(object):
         self.pushButton_2.setText(_translate("MainWindow", "Вывести изображение"))
 
 
+# Фон окна: файл рядом с программой, непрозрачность 60% и число закешированных размеров
+BACKGROUND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "background.png")
+BACKGROUND_OPACITY = 0.6
+BACKGROUND_CACHE_SIZE = 4
+# Через сколько мс после последнего изменения размера фон пересчитывается с качественным сглаживанием
+RESIZE_SETTLE_MS = 150
+
+
 class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
@@ -70,6 +81,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         # Флаг для отслеживания состояния фона
         self.background_set = False
+        # Исходное изображение фона и его копии под размеры окна: (ширина, высота, DPR) -> QPixmap (LRU)
+        self._background_source = None
+        self._background_cache = OrderedDict()
+        # Пока окно тянут мышью, фон рисуется из ближайшей готовой копии без пересчёта
+        self._resizing = False
+        self._resize_timer = QtCore.QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(RESIZE_SETTLE_MS)
+        self._resize_timer.timeout.connect(self._resize_settled)
 
     def change_name(self):
         """Меняет имя на следующее из списка"""
@@ -78,37 +98,91 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.label.setText(new_name)
 
     def set_background_image(self):
-        """Устанавливает полупрозрачный PNG фон через комбинацию методов"""
-        if not self.background_set:
-            # Устанавливаем фон через CSS с прозрачностью
-            style = f"""
-            MainWindow {{
-                background-image: url(background.png);
-                background-repeat: no-repeat;
-                background-position: center;
-                background-attachment: fixed;
-                background-origin: content;
-                background-clip: content;
-            }}
-            """
-            self.setStyleSheet(style)
-
-            # Дополнительно устанавливаем прозрачность для окна
-            self.setWindowOpacity(0.6)  # 60% непрозрачности = 40% прозрачности
-
-            self.background_set = True
+        """Включает/выключает полупрозрачный PNG фон (рисуется в paintEvent, без стилей)"""
+        self.background_set = not self.background_set
+        if self.background_set:
             self.pushButton_2.setText("Убрать изображение")
         else:
-            # Восстанавливаем стандартные настройки
-            self.setStyleSheet("")
-            self.setWindowOpacity(1.0)  # Полная непрозрачность
-            self.background_set = False
             self.pushButton_2.setText("Вывести изображение")
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Первое отображение окна - не перетаскивание, фон сразу рисуется качественно
+        if event.oldSize().isValid():
+            self._resizing = True
+            self._resize_timer.start()
+
+    def _resize_settled(self):
+        self._resizing = False
+        if self.background_set:
+            self.update()
+
+    def background_pixmap(self):
+        """Фон, масштабированный под текущий размер окна и плотность пикселей экрана.
+
+        Во время изменения размера возвращается ближайшая готовая копия (или исходное
+        изображение) - её растягивает painter, а точный пересчёт откладывается.
+        """
+        if self._background_source is None:
+            # Файл читается и декодируется один раз за время работы программы
+            self._background_source = QtGui.QPixmap(BACKGROUND_PATH)
+        if self._background_source.isNull():
+            return None
+
+        ratio = self.devicePixelRatioF()
+        key = (self.width(), self.height(), ratio)
+        pixmap = self._background_cache.get(key)
+        if pixmap is not None:
+            self._background_cache.move_to_end(key)
+            return pixmap
+        if self._resizing:
+            candidates = [pixmap for (width, height, cached_ratio), pixmap in self._background_cache.items()
+                          if cached_ratio == ratio]
+            if not candidates:
+                return self._background_source
+            return min(candidates, key=lambda p: abs(p.width() - self.width() * ratio)
+                       + abs(p.height() - self.height() * ratio))
+
+        pixmap = self._background_source.scaled(
+            int(self.width() * ratio), int(self.height() * ratio),
+            QtCore.Qt.AspectRatioMode.KeepAspectRatio, QtCore.Qt.TransformationMode.SmoothTransformation)
+        pixmap.setDevicePixelRatio(ratio)
+        if len(self._background_cache) >= BACKGROUND_CACHE_SIZE:
+            self._background_cache.popitem(last=False)
+        self._background_cache[key] = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.background_set:
+            return
+        pixmap = self.background_pixmap()
+        if pixmap is None:
+            return
+        # Прямоугольник фона с сохранением пропорций по центру окна
+        size = self._background_source.size().scaled(self.size(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        target = QtCore.QRect(QtCore.QPoint(), size)
+        target.moveCenter(self.rect().center())
+        # Полупрозрачным делается только изображение, а не всё окно
+        painter = QtGui.QPainter(self)
+        painter.setOpacity(BACKGROUND_OPACITY)
+        painter.drawPixmap(target, pixmap)
+        painter.end()
 
 if __name__ == "__main__":
     import sys
 
+    slot_profiler = None
+    if os.environ.get("GUI_PROFILE"):
+        # Общий профилировщик слотов (gui_profiler.py в корне репозитория)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+        from gui_profiler import install_from_env
+        slot_profiler = install_from_env(MainWindow)
+
     app = QtWidgets.QApplication(sys.argv)
+    if slot_profiler is not None:
+        slot_profiler.start()
 
     # Создаем и показываем главное окно
     window = MainWindow()
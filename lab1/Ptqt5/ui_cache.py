@@ -0,0 +1,67 @@
+import io
+import os
+import sys
+import glob
+import hashlib
+import importlib.util
+
+from PyQt6 import QtWidgets
+from PyQt6.QtCore import PYQT_VERSION_STR
+
+# Папка со скомпилированными модулями рядом с .ui
+CACHE_DIR_NAME = "__uicache__"
+
+
+def load_ui_type(ui_path, cache_dir=None):
+    """Замена uic.loadUiType: .ui компилируется в Python один раз и кешируется.
+
+    Ключ кеша - хеш содержимого .ui и версия PyQt, поэтому после правки формы
+    или обновления PyQt модуль пересобирается, а в остальных запусках просто
+    импортируется (вместе с байткодом из __pycache__). Возвращает (form, base).
+    """
+    ui_path = os.path.abspath(ui_path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(ui_path), CACHE_DIR_NAME)
+    with open(ui_path, 'rb') as f:
+        content = f.read()
+
+    stem = os.path.splitext(os.path.basename(ui_path))[0]
+    key = hashlib.sha256(content + PYQT_VERSION_STR.encode()).hexdigest()[:16]
+    module_name = f"{stem}_{key}"
+    module_path = os.path.join(cache_dir, module_name + ".py")
+    if not os.path.exists(module_path):
+        _compile(content, stem, cache_dir, module_path)
+
+    module = sys.modules.get(module_name) or _import(module_name, module_path)
+    form_class = next(value for name, value in vars(module).items()
+                      if name.startswith("Ui_") and isinstance(value, type))
+    return form_class, getattr(QtWidgets, module.__ui_base_class__)
+
+
+def _compile(content, stem, cache_dir, module_path):
+    # uic и разбор XML нужны только при компиляции, запуск с готовым кешем их не импортирует
+    import xml.etree.ElementTree as ET
+    from PyQt6 import uic
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Модули от прошлых версий этого .ui больше не нужны
+    for old_path in glob.glob(os.path.join(cache_dir, f"{stem}_*.py")):
+        os.remove(old_path)
+
+    code = io.StringIO()
+    uic.compileUi(io.BytesIO(content), code)
+    # Базовый класс окна (класс корневого виджета) - то, что loadUiType возвращает вторым
+    base_class = ET.fromstring(content).find("widget").get("class")
+    code.write(f"\n__ui_base_class__ = {base_class!r}\n")
+
+    temp_path = module_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(code.getvalue())
+    os.replace(temp_path, module_path)
+
+
+def _import(module_name, module_path):
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[module_name] = module
+    return module
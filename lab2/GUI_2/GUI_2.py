@@ -1,5 +1,9 @@
+import time
+START_TIME = time.perf_counter()
+
+import os
 import sys
-import requests
+from contextlib import nullcontext
 from PyQt6 import QtWidgets, QtCore
 from PyQt6.QtCore import QThread, pyqtSignal
 
@@ -8,55 +12,61 @@ from common_signals import common_signals
 from usd_signals import usd_signals
 from eur_signals import eur_signals
 from rub_signals import rub_signals
+from rate_history import RateHistoryStore
+from latency_probe import probe_from_env
+from startup_profile import StartupProfiler
+
+# Запасные курсы на случай недоступности API
+BACKUP_RATES = {
+    'USD_RUB': 90.0,
+    'EUR_RUB': 98.0,
+    'USD_EUR': 0.92
+}
 
 
 class ExchangeRateWorker(QThread):
-    """Поток для получения курсов валют из API"""
+    """Поток для получения курсов валют сразу от нескольких провайдеров"""
     rates_ready = pyqtSignal(dict)
+    # Только курсы от провайдеров, без подстановки запасных
+    live_rates_ready = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, fetcher):
         super().__init__()
-        self.api_url = "https://api.exchangerate-api.com/v4/latest/USD"
+        self.fetcher = fetcher
 
     def run(self):
         try:
-            response = requests.get(self.api_url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                rates = {
-                    'USD_RUB': data['rates']['RUB'],
-                    'EUR_RUB': data['rates']['RUB'] / data['rates']['EUR'],
-                    'USD_EUR': data['rates']['EUR']
-                }
-                self.rates_ready.emit(rates)
-            else:
-                self.error_occurred.emit(f"Ошибка API: {response.status_code}")
+            rates = self.fetcher.fetch()
+            self.rates_ready.emit(rates)
+            self.live_rates_ready.emit(rates)
         except Exception as e:
             # Используем запасные курсы при ошибке
-            backup_rates = {
-                'USD_RUB': 90.0,
-                'EUR_RUB': 98.0,
-                'USD_EUR': 0.92
-            }
-            self.rates_ready.emit(backup_rates)
+            self.rates_ready.emit(dict(BACKUP_RATES))
             self.error_occurred.emit(f"Используются запасные курсы: {str(e)}")
 
 
 class CurrencyConverter:
-    def __init__(self):
-        self.exchange_rates = {
-            'USD_RUB': 90.0,
-            'EUR_RUB': 98.0,
-            'USD_EUR': 0.92
-        }
+    def __init__(self, history_store=None, fetcher=None, start_fetch=True):
+        self.exchange_rates = dict(BACKUP_RATES)
         self.updating = False
 
+        # Опрос провайдеров курсов; создаётся при первом обновлении,
+        # чтобы не импортировать сетевой стек при запуске
+        self.fetcher = fetcher
+
+        # Локальная история всех полученных курсов
+        self.history_store = history_store if history_store is not None else RateHistoryStore()
+
         # Подключаем обработчики сигналов
         self.connect_signals()
 
+        # Сразу показываем последние известные курсы
+        self.load_last_known_rates()
+
         # Запускаем получение актуальных курсов
-        self.get_exchange_rates()
+        if start_fetch:
+            self.get_exchange_rates()
 
     def connect_signals(self):
         """Подключение всех сигналов"""
@@ -66,22 +76,44 @@ class CurrencyConverter:
         common_signals.clear_all.connect(self.clear_all)
         common_signals.rates_updated.connect(self.update_rates)
 
-    def get_exchange_rates(self):
-        """Запуск потока для получения курсов валют"""
-        self.worker = ExchangeRateWorker()
+    def get_exchange_rates(self, before_start=None):
+        """Запуск потока для получения курсов валют.
+
+        before_start(worker) подключает дополнительные обработчики до запуска потока.
+        """
+        if self.fetcher is None:
+            from rate_providers import MultiProviderFetcher
+            self.fetcher = MultiProviderFetcher()
+        self.worker = ExchangeRateWorker(self.fetcher)
         self.worker.rates_ready.connect(self.on_rates_ready)
         self.worker.error_occurred.connect(self.on_rates_error)
+        if before_start is not None:
+            before_start(self.worker)
         self.worker.start()
 
+    def load_last_known_rates(self):
+        """Курсы из локальной истории (без обращения к сети)"""
+        rates = self.history_store.latest_rates()
+        if set(rates) >= set(BACKUP_RATES):
+            self.exchange_rates = {key: rates[key] for key in BACKUP_RATES}
+            common_signals.rates_updated.emit(self.exchange_rates)
+
     def on_rates_ready(self, rates):
         """Обработка полученных курсов"""
         self.exchange_rates = rates
+        # Запасные курсы в историю не записываем
+        if rates != BACKUP_RATES:
+            self.history_store.add_snapshot(rates)
         common_signals.rates_updated.emit(rates)
 
     def on_rates_error(self, error_message):
         """Обработка ошибки получения курсов"""
         print(f"Ошибка: {error_message}")
 
+    def convert_as_of(self, amount, currency, timestamp):
+        """Конвертация по курсу на дату timestamp без обращения к API"""
+        return self.history_store.convert_as_of(amount, currency, timestamp)
+
     def update_rates(self, rates):
         """Обновление курсов валют"""
         self.exchange_rates = rates
@@ -169,7 +201,7 @@ class CurrencyConverter:
 
 
 class Ui_MainWindow(object):
-    def setupUi(self, MainWindow):
+    def setupUi(self, MainWindow, start_fetch=True):
         MainWindow.setObjectName("MainWindow")
         MainWindow.resize(498, 367)
         self.centralwidget = QtWidgets.QWidget(parent=MainWindow)
@@ -226,11 +258,16 @@ class Ui_MainWindow(object):
         # Флаг для предотвращения рекурсивных обновлений
         self.updating = False
 
+        # Замер задержки правок (включается переменной окружения GUI2_LATENCY)
+        self.latency_probe = probe_from_env()
+
         # Подключаем UI сигналы
         self.connect_ui_signals()
 
-        # Инициализируем конвертер
-        self.converter = CurrencyConverter()
+        # Инициализируем конвертер; живые курсы запрашиваем уже из цикла событий
+        self.converter = CurrencyConverter(start_fetch=False)
+        if start_fetch:
+            QtCore.QTimer.singleShot(0, self.converter.get_exchange_rates)
 
     def connect_ui_signals(self):
         """Подключение сигналов UI"""
@@ -254,17 +291,26 @@ class Ui_MainWindow(object):
     def on_rub_input_changed(self, text):
         """Обработка изменения поля RUB (отправка сигнала)"""
         if not self.updating:
-            rub_signals.rub_changed.emit(text)
+            with self.measure_edit():
+                rub_signals.rub_changed.emit(text)
 
     def on_usd_input_changed(self, text):
         """Обработка изменения поля USD (отправка сигнала)"""
         if not self.updating:
-            usd_signals.usd_changed.emit(text)
+            with self.measure_edit():
+                usd_signals.usd_changed.emit(text)
 
     def on_eur_input_changed(self, text):
         """Обработка изменения поля EUR (отправка сигнала)"""
         if not self.updating:
-            eur_signals.eur_changed.emit(text)
+            with self.measure_edit():
+                eur_signals.eur_changed.emit(text)
+
+    def measure_edit(self):
+        """Контекст замера одной правки (пустой, если замеры выключены)"""
+        if self.latency_probe is None:
+            return nullcontext()
+        return self.latency_probe.measure_edit()
 
     def on_rub_signal_received(self, text):
         """Обработка получения сигнала RUB (обновление поля)"""
@@ -318,9 +364,36 @@ class Ui_MainWindow(object):
 
 
 if __name__ == "__main__":
+    slot_profiler = None
+    if os.environ.get("GUI_PROFILE"):
+        # Общий профилировщик слотов (gui_profiler.py в корне репозитория)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+        from gui_profiler import install_from_env
+        slot_profiler = install_from_env(ExchangeRateWorker, CurrencyConverter, Ui_MainWindow)
+
+    profiler = StartupProfiler(START_TIME)
+    profiler.mark("imports")
     app = QtWidgets.QApplication(sys.argv)
+    profiler.mark("qt_init")
+    if slot_profiler is not None:
+        slot_profiler.start()
     MainWindow = QtWidgets.QMainWindow()
     ui = Ui_MainWindow()
-    ui.setupUi(MainWindow)
+    ui.setupUi(MainWindow, start_fetch=False)
+    profiler.mark("ui_build")
+
+    def start_live_rates():
+        """Первый запрос курсов - только после того, как окно отрисовано"""
+        def connect_profiler(worker):
+            # Запасные курсы при недоступности всех провайдеров - не живые курсы
+            worker.live_rates_ready.connect(lambda rates: profiler.finish("first_live_rates"))
+            worker.error_occurred.connect(lambda message: profiler.finish("backup_rates"))
+
+        ui.converter.get_exchange_rates(before_start=connect_profiler)
+
+    profiler.on_first_paint(MainWindow, start_live_rates)
     MainWindow.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    exit_code = app.exec()
+    if ui.latency_probe is not None:
+        print(ui.latency_probe.report())
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Headless-бенчмарк цикла сигналов конвертера.
+
+Запуск: python bench_typing.py [--repeat N] [--json results.json]
+Окно создаётся на платформе offscreen, набор текста воспроизводится
+через QTest, задержка каждой правки меряется SignalLatencyProbe.
+"""
+import os
+import sys
+import json
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtWidgets, QtCore
+from PyQt6.QtTest import QTest
+
+from GUI_2 import Ui_MainWindow
+from latency_probe import SignalLatencyProbe
+
+
+# Сценарии набора: (поле, последовательность действий)
+# Строка - набор символов, число - количество нажатий Backspace
+SCENARIOS = {
+    'rub_typing': ('rub_input', ["125000.50"]),
+    'usd_typing': ('usd_input', ["1999.99"]),
+    'eur_edit_and_fix': ('eur_input', ["1234", 2, "56.7", 4, "9.99"]),
+    'invalid_input': ('rub_input', ["12a", 1, "b3", 3]),
+}
+
+
+def replay(ui, field_name, actions):
+    field = getattr(ui, field_name)
+    for action in actions:
+        if isinstance(action, str):
+            QTest.keyClicks(field, action)
+        else:
+            for _ in range(action):
+                QTest.keyClick(field, QtCore.Qt.Key.Key_Backspace)
+
+
+def run_benchmark(repeat):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    window = QtWidgets.QMainWindow()
+    ui = Ui_MainWindow()
+    # Без сетевого запроса: замеры идут на последних известных курсах
+    ui.setupUi(window, start_fetch=False)
+    window.show()
+    app.processEvents()
+
+    probe = SignalLatencyProbe()
+    probe.attach()
+    ui.latency_probe = probe
+
+    results = {}
+    for name, (field_name, actions) in SCENARIOS.items():
+        probe.reset()
+        for _ in range(repeat):
+            replay(ui, field_name, actions)
+            ui.clear_fields()
+        results[name] = probe.summary()
+
+    probe.detach()
+    window.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк задержки правок конвертера")
+    parser.add_argument("--repeat", type=int, default=200, help="повторов каждого сценария")
+    parser.add_argument("--json", help="файл для результатов в формате JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat)
+    for name, stats in results.items():
+        print(f"{name:18} edits={stats['edits']:5d} emissions/edit={stats['emissions_per_edit']:.1f} "
+              f"p50={stats['p50_us']:.0f}us p90={stats['p90_us']:.0f}us "
+              f"p99={stats['p99_us']:.0f}us max={stats['max_us']:.0f}us")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import time
+from contextlib import contextmanager
+
+from usd_signals import usd_signals
+from eur_signals import eur_signals
+from rub_signals import rub_signals
+
+
+# Переменная окружения для включения замеров в обычном запуске приложения
+LATENCY_ENV_VAR = "GUI2_LATENCY"
+
+
+def percentile(values, p):
+    """Перцентиль p (0-100) методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class SignalLatencyProbe:
+    """Счётчик эмиссий сигналов валют и задержки полного цикла одного редактирования"""
+
+    def __init__(self):
+        self.emissions = {'rub_changed': 0, 'usd_changed': 0, 'eur_changed': 0}
+        self.latencies = []
+        self.emissions_per_edit = []
+        self._attached = False
+
+    def attach(self):
+        """Подключение счётчиков к сигналам валют"""
+        if self._attached:
+            return
+        rub_signals.rub_changed.connect(self._count_rub)
+        usd_signals.usd_changed.connect(self._count_usd)
+        eur_signals.eur_changed.connect(self._count_eur)
+        self._attached = True
+
+    def detach(self):
+        if not self._attached:
+            return
+        rub_signals.rub_changed.disconnect(self._count_rub)
+        usd_signals.usd_changed.disconnect(self._count_usd)
+        eur_signals.eur_changed.disconnect(self._count_eur)
+        self._attached = False
+
+    def reset(self):
+        for name in self.emissions:
+            self.emissions[name] = 0
+        self.latencies = []
+        self.emissions_per_edit = []
+
+    def _count_rub(self, text):
+        self.emissions['rub_changed'] += 1
+
+    def _count_usd(self, text):
+        self.emissions['usd_changed'] += 1
+
+    def _count_eur(self, text):
+        self.emissions['eur_changed'] += 1
+
+    def total_emissions(self):
+        return sum(self.emissions.values())
+
+    @contextmanager
+    def measure_edit(self):
+        """Замер одного редактирования: от textChanged до последнего setText.
+
+        Все сигналы валют соединены напрямую (один поток), поэтому к выходу
+        из блока весь цикл конвертации уже завершён.
+        """
+        emitted_before = self.total_emissions()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.emissions_per_edit.append(self.total_emissions() - emitted_before)
+
+    def summary(self):
+        """Сводка: число правок, эмиссии и перцентили задержки в микросекундах"""
+        latencies_us = [value * 1e6 for value in self.latencies]
+        edits = len(latencies_us)
+        return {
+            'edits': edits,
+            'emissions': dict(self.emissions),
+            'emissions_per_edit': (sum(self.emissions_per_edit) / edits) if edits else 0.0,
+            'p50_us': percentile(latencies_us, 50),
+            'p90_us': percentile(latencies_us, 90),
+            'p99_us': percentile(latencies_us, 99),
+            'max_us': max(latencies_us) if latencies_us else 0.0,
+        }
+
+    def report(self):
+        stats = self.summary()
+        return (f"Правок: {stats['edits']} | эмиссий на правку: {stats['emissions_per_edit']:.1f} | "
+                f"p50 {stats['p50_us']:.0f} мкс | p90 {stats['p90_us']:.0f} мкс | "
+                f"p99 {stats['p99_us']:.0f} мкс | max {stats['max_us']:.0f} мкс")
+
+
+def probe_from_env():
+    """Создаёт подключённый probe, если задана переменная GUI2_LATENCY"""
+    if not os.environ.get(LATENCY_ENV_VAR):
+        return None
+    probe = SignalLatencyProbe()
+    probe.attach()
+    return probe
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import time
+from bisect import bisect_right
+
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rates_history.db")
+
+
+class RateHistoryStore:
+    """Локальное хранилище истории курсов (SQLite, ключ (currency, timestamp))"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rates ("
+            "currency TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, "
+            "rate REAL NOT NULL, "
+            "PRIMARY KEY (currency, timestamp)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.commit()
+        # Отсортированные временные ряды в памяти для бинарного поиска
+        self._series = {}
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def add_snapshot(self, rates, timestamp=None):
+        """Сохранение набора курсов, полученного в момент timestamp"""
+        if timestamp is None:
+            timestamp = time.time()
+        rows = [(currency, timestamp, float(rate)) for currency, rate in rates.items()]
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO rates (currency, timestamp, rate) VALUES (?, ?, ?)", rows)
+        self.connection.commit()
+
+        for currency, ts, rate in rows:
+            series = self._series.get(currency)
+            if series is None:
+                continue
+            times, values = series
+            if not times or ts > times[-1]:
+                times.append(ts)
+                values.append(rate)
+            else:
+                # Вставка "в прошлое" - просто перечитаем ряд при следующем запросе
+                del self._series[currency]
+
+    def currencies(self):
+        cursor = self.connection.execute("SELECT DISTINCT currency FROM rates ORDER BY currency")
+        return [row[0] for row in cursor.fetchall()]
+
+    def _get_series(self, currency):
+        series = self._series.get(currency)
+        if series is None:
+            cursor = self.connection.execute(
+                "SELECT timestamp, rate FROM rates WHERE currency = ? ORDER BY timestamp",
+                (currency,))
+            times, values = [], []
+            for ts, rate in cursor:
+                times.append(ts)
+                values.append(rate)
+            series = (times, values)
+            self._series[currency] = series
+        return series
+
+    def rate_as_of(self, currency, timestamp):
+        """Последний известный курс на момент timestamp (None, если раньше данных нет)"""
+        times, values = self._get_series(currency)
+        position = bisect_right(times, timestamp)
+        if position == 0:
+            return None
+        return values[position - 1]
+
+    def rates_as_of(self, timestamp):
+        """Полный набор курсов на момент timestamp"""
+        rates = {}
+        for currency in self.currencies():
+            rate = self.rate_as_of(currency, timestamp)
+            if rate is not None:
+                rates[currency] = rate
+        return rates
+
+    def latest_rates(self):
+        """Последний сохранённый набор курсов"""
+        return self.rates_as_of(float("inf"))
+
+    def range(self, currency, start, end):
+        """Список (timestamp, rate) за интервал [start, end] - для графиков"""
+        cursor = self.connection.execute(
+            "SELECT timestamp, rate FROM rates "
+            "WHERE currency = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp",
+            (currency, start, end))
+        return cursor.fetchall()
+
+    def convert_as_of(self, amount, currency, timestamp):
+        """Конвертация суммы по курсу currency (например, 'USD_RUB') на дату timestamp"""
+        rate = self.rate_as_of(currency, timestamp)
+        if rate is None:
+            return None
+        return amount * rate
@@ -0,0 +1,204 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FetchError(Exception):
+    """Ни один провайдер не вернул корректные курсы"""
+
+
+def rates_from_usd(usd_rub, usd_eur):
+    """Курсы приложения из котировок относительно доллара"""
+    return {
+        'USD_RUB': usd_rub,
+        'EUR_RUB': usd_rub / usd_eur,
+        'USD_EUR': usd_eur
+    }
+
+
+def parse_rates_table(data):
+    """Формат {"rates": {"RUB": ..., "EUR": ...}} (exchangerate-api, open.er-api)"""
+    return rates_from_usd(float(data['rates']['RUB']), float(data['rates']['EUR']))
+
+
+def parse_currency_api(data):
+    """Формат {"usd": {"rub": ..., "eur": ...}} (fawazahmed0/currency-api)"""
+    return rates_from_usd(float(data['usd']['rub']), float(data['usd']['eur']))
+
+
+# Провайдеры курсов: имя, адрес, собственный таймаут (сек) и разборщик ответа
+PROVIDERS = [
+    {
+        'name': 'exchangerate-api',
+        'url': "https://api.exchangerate-api.com/v4/latest/USD",
+        'timeout': 4.0,
+        'parser': parse_rates_table,
+    },
+    {
+        'name': 'open-er-api',
+        'url': "https://open.er-api.com/v6/latest/USD",
+        'timeout': 4.0,
+        'parser': parse_rates_table,
+    },
+    {
+        'name': 'currency-api',
+        'url': "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/usd.json",
+        'timeout': 4.0,
+        'parser': parse_currency_api,
+    },
+]
+
+MODE_FIRST = 'first'
+MODE_QUORUM = 'quorum'
+
+
+def http_get_json(url, timeout):
+    # requests импортируется только при первом обновлении курсов
+    import requests
+    response = requests.get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise FetchError(f"HTTP {response.status_code}")
+    return response.json()
+
+
+class ProviderHealth:
+    """Скользящие оценки успешности и задержки провайдера.
+
+    record() вызывается и из цикла asyncio, и из потоков пула (запоздавшие
+    ответы проигравших провайдеров), поэтому обе оценки меняются под блокировкой.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.success = 1.0
+        self.latency = 0.0
+
+    def record(self, ok, elapsed):
+        with self._lock:
+            self.success += self.ALPHA * ((1.0 if ok else 0.0) - self.success)
+            self.latency += self.ALPHA * (elapsed - self.latency)
+
+    def snapshot(self):
+        """Согласованная пара (success, latency)"""
+        with self._lock:
+            return self.success, self.latency
+
+    @property
+    def score(self):
+        success, latency = self.snapshot()
+        return success / (1.0 + latency)
+
+
+class MultiProviderFetcher:
+    """Параллельный опрос нескольких провайдеров курсов через asyncio.
+
+    mode='first'  - возвращается первый корректный ответ;
+    mode='quorum' - ждём quorum корректных ответов и берём медиану по каждому курсу.
+    """
+
+    # Провайдеры с оценкой ниже порога пропускаются, кроме каждого RETRY_EVERY-го запроса
+    MIN_SCORE = 0.25
+    RETRY_EVERY = 5
+
+    def __init__(self, providers=None, mode=MODE_FIRST, quorum=2, http_get=http_get_json):
+        self.providers = list(providers if providers is not None else PROVIDERS)
+        self.mode = mode
+        self.quorum = quorum
+        self.http_get = http_get
+        self.health = {provider['name']: ProviderHealth() for provider in self.providers}
+        self._fetch_count = 0
+
+    def fetch(self):
+        """Синхронная обёртка для вызова из рабочего потока"""
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.fetch_async())
+        finally:
+            loop.close()
+
+    def _select_providers(self):
+        ordered = sorted(self.providers, key=lambda p: self.health[p['name']].score, reverse=True)
+        if self._fetch_count % self.RETRY_EVERY == 0:
+            return ordered
+        healthy = [p for p in ordered if self.health[p['name']].score >= self.MIN_SCORE]
+        return healthy if len(healthy) >= self._required() else ordered
+
+    def _required(self):
+        if self.mode == MODE_QUORUM:
+            return min(self.quorum, len(self.providers))
+        return 1
+
+    async def _query(self, provider, executor):
+        timeout = provider.get('timeout', 10.0)
+        start = time.perf_counter()
+        request = executor.submit(self.http_get, provider['url'], timeout)
+        try:
+            data = await asyncio.wait_for(asyncio.wrap_future(request), timeout)
+            rates = provider['parser'](data)
+        except asyncio.CancelledError:
+            # Провайдер проиграл гонку: запрос дорабатывает в пуле, и его настоящая
+            # задержка (или ошибка) всё равно попадает в оценку
+            request.add_done_callback(lambda done: self._record_late(provider, done, start, timeout))
+            raise
+        except Exception as e:
+            self.health[provider['name']].record(False, time.perf_counter() - start)
+            raise FetchError(f"{provider['name']}: {e!r}") from e
+        self.health[provider['name']].record(True, time.perf_counter() - start)
+        return rates
+
+    def _record_late(self, provider, request, start, timeout):
+        if request.cancelled():
+            return
+        elapsed = time.perf_counter() - start
+        self.health[provider['name']].record(request.exception() is None and elapsed <= timeout, elapsed)
+
+    async def fetch_async(self, executor=None):
+        """Опрос провайдеров; без executor создаётся собственный пул потоков.
+
+        Собственный пул закрывается без ожидания, чтобы медленные провайдеры
+        не задерживали уже полученный результат.
+        """
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=len(self.providers) or 1)
+            try:
+                return await self.fetch_async(executor)
+            finally:
+                executor.shutdown(wait=False)
+        self._fetch_count += 1
+        providers = self._select_providers()
+        required = self._required()
+        tasks = [asyncio.ensure_future(self._query(provider, executor)) for provider in providers]
+
+        results = []
+        errors = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    results.append(await next_done)
+                except FetchError as e:
+                    errors.append(str(e))
+                    continue
+                if len(results) >= required:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if len(results) < required:
+            raise FetchError(f"получено ответов {len(results)} из {required}: " + "; ".join(errors))
+        if self.mode == MODE_QUORUM:
+            return {key: statistics.median(rates[key] for rates in results) for key in results[0]}
+        return results[0]
+
+    def health_report(self):
+        report = {}
+        for name, h in self.health.items():
+            success, latency = h.snapshot()
+            report[name] = {'score': round(success / (1.0 + latency), 3), 'success': round(success, 3),
+                            'latency': round(latency, 3)}
+        return report
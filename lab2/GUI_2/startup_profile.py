@@ -0,0 +1,51 @@
+import time
+
+from PyQt6.QtCore import QObject, QEvent, QTimer
+
+
+class StartupProfiler(QObject):
+    """Разбивка времени запуска по фазам: импорты, сборка UI, первая отрисовка, живые курсы"""
+
+    def __init__(self, start_time):
+        super().__init__()
+        self.start_time = start_time
+        self.marks = []
+        self._paint_callback = None
+        self._watched = None
+        self._reported = False
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def on_first_paint(self, widget, callback=None):
+        """Отметка first_paint при первой отрисовке окна и вызов callback после неё"""
+        self._paint_callback = callback
+        self._watched = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self._watched and event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            self._watched = None
+            self.mark("first_paint")
+            if self._paint_callback is not None:
+                # Запускаем после завершения текущей отрисовки
+                QTimer.singleShot(0, self._paint_callback)
+        return False
+
+    def finish(self, phase):
+        """Последняя фаза: отметка и однократный вывод отчёта"""
+        if self._reported:
+            return
+        self._reported = True
+        self.mark(phase)
+        print(self.report())
+
+    def report(self):
+        lines = ["Время запуска:"]
+        previous = self.start_time
+        for phase, moment in self.marks:
+            lines.append(f"  {phase:18} +{(moment - previous) * 1000:7.1f} мс  "
+                         f"(всего {(moment - self.start_time) * 1000:7.1f} мс)")
+            previous = moment
+        return "\n".join(lines)
@@ -0,0 +1,121 @@
+"""Тесты MultiProviderFetcher против локальных HTTP-заглушек.
+
+Запуск: python -m pytest test_rate_providers.py (или python -m unittest test_rate_providers)
+"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_providers import MultiProviderFetcher, FetchError, MODE_FIRST, MODE_QUORUM, parse_rates_table
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Путь -> (задержка в секундах, HTTP-статус, тело ответа); задаётся тестом
+    routes = {}
+
+    def do_GET(self):
+        delay, status, body = self.routes[self.path]
+        time.sleep(delay)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def rates_body(rub, eur):
+    return json.dumps({'rates': {'RUB': rub, 'EUR': eur}})
+
+
+class MultiProviderFetcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubHandler.routes = {}
+
+    def provider(self, name, delay=0.0, status=200, body=None, timeout=2.0):
+        StubHandler.routes['/' + name] = (delay, status, body if body is not None else rates_body(90.0, 0.9))
+        return {
+            'name': name,
+            'url': f"http://127.0.0.1:{self.server.server_address[1]}/{name}",
+            'timeout': timeout,
+            'parser': parse_rates_table,
+        }
+
+    def test_first_valid_answer_wins(self):
+        fetcher = MultiProviderFetcher([
+            self.provider('slow', delay=1.0, body=rates_body(100.0, 0.8)),
+            self.provider('fast', delay=0.05, body=rates_body(90.0, 0.9)),
+        ], mode=MODE_FIRST)
+        start = time.perf_counter()
+        rates = fetcher.fetch()
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(rates['USD_RUB'], 90.0)
+        self.assertAlmostEqual(rates['EUR_RUB'], 100.0)
+
+    def test_quorum_takes_median(self):
+        fetcher = MultiProviderFetcher([
+            self.provider('a', delay=0.01, body=rates_body(90.0, 0.90)),
+            self.provider('b', delay=0.02, body=rates_body(200.0, 0.95)),
+            self.provider('c', delay=0.03, body=rates_body(100.0, 0.80)),
+        ], mode=MODE_QUORUM, quorum=3)
+        rates = fetcher.fetch()
+        self.assertEqual(rates['USD_RUB'], 100.0)
+        self.assertEqual(rates['USD_EUR'], 0.90)
+
+    def test_provider_timeout(self):
+        fetcher = MultiProviderFetcher([
+            self.provider('fast', delay=0.0),
+            self.provider('hanging', delay=1.5, timeout=0.2),
+        ], mode=MODE_QUORUM, quorum=2)
+        start = time.perf_counter()
+        with self.assertRaises(FetchError) as error:
+            fetcher.fetch()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn('hanging', str(error.exception))
+        self.assertLess(fetcher.health['hanging'].success, 1.0)
+        self.assertEqual(fetcher.health['fast'].success, 1.0)
+
+    def test_all_providers_fail(self):
+        fetcher = MultiProviderFetcher([
+            self.provider('server-error', status=500),
+            self.provider('bad-json', body='not json'),
+            self.provider('wrong-format', body=json.dumps({'usd': {}})),
+        ], mode=MODE_FIRST)
+        with self.assertRaises(FetchError) as error:
+            fetcher.fetch()
+        for name in ('server-error', 'bad-json', 'wrong-format'):
+            self.assertIn(name, str(error.exception))
+            self.assertLess(fetcher.health[name].success, 1.0)
+
+    def test_slow_provider_that_lost_the_race_is_penalized(self):
+        fetcher = MultiProviderFetcher([
+            self.provider('fast', delay=0.0),
+            self.provider('slow', delay=0.4),
+        ], mode=MODE_FIRST)
+        fetcher.fetch()
+        # Проигравший запрос дорабатывает в фоне и записывает свою задержку
+        time.sleep(0.8)
+        self.assertGreater(fetcher.health['slow'].latency, 0.1)
+        self.assertLess(fetcher.health['slow'].score, fetcher.health['fast'].score)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,17 @@
+import os
 import sys
 import sqlite3
+import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QTabWidget, QComboBox,
                              QTableWidget, QTableWidgetItem, QMessageBox, QLabel,
                              QLineEdit, QFileDialog)
 from PyQt5.QtCore import Qt
 
+from query_scheduler import QueryScheduler
+from db_diff import DiffWorker
+from search_index import SearchIndex, SearchIndexer
+
 
 class DatabaseManager:
     def __init__(self):
@@ -78,10 +84,24 @@ class DatabaseManager:
 
 
 class MainWindow(QMainWindow):
+    # Rapid column changes within this delay replace each other before querying
+    COLUMN_SELECT_DELAY_MS = 150
+    DIFF_HEADERS = ['Table', 'Change', 'Key', 'This DB', 'Other DB']
+    # Typing within this delay replaces the pending search
+    SEARCH_DELAY_MS = 200
+    SEARCH_LIMIT = 200
+
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
         self.init_ui()
+        # Queries for the visible tab run first, hidden tabs are prefetched when idle
+        self.scheduler = QueryScheduler(self.tab_widget, self)
+        self.diff_worker = None
+        self.search_index = None
+        self.search_worker = None
+        self.search_progress = ''
+        self.search_summary = ''
 
     def init_ui(self):
         self.setWindowTitle('SQL Database Browser')
@@ -111,21 +131,30 @@ class MainWindow(QMainWindow):
 
         # Query buttons and combo box
         self.bt1 = QPushButton('Show Table Names')
-        self.bt1.clicked.connect(self.execute_select_column)
+        self.bt1.clicked.connect(self.schedule_table_names)
         self.bt1.setEnabled(False)
 
         self.columns_combo = QComboBox()
         self.columns_combo.setEnabled(False)
-        self.columns_combo.currentTextChanged.connect(self.on_column_selected)
+        self.columns_combo.currentTextChanged.connect(self.schedule_column_data)
 
         self.bt2 = QPushButton('Show Tables Data')
-        self.bt2.clicked.connect(self.execute_query2)
+        self.bt2.clicked.connect(self.schedule_tables_data)
         self.bt2.setEnabled(False)
 
         self.bt3 = QPushButton('Show Table Info')
-        self.bt3.clicked.connect(self.execute_query3)
+        self.bt3.clicked.connect(self.schedule_table_structure)
         self.bt3.setEnabled(False)
 
+        self.diff_btn = QPushButton('Diff with...')
+        self.diff_btn.clicked.connect(self.start_diff)
+        self.diff_btn.setEnabled(False)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Search all tables...')
+        self.search_edit.textChanged.connect(self.schedule_search)
+        self.search_edit.setEnabled(False)
+
         # Add widgets to menu layout
         menu_layout.addWidget(self.connect_btn)
         menu_layout.addWidget(self.close_btn)
@@ -133,6 +162,8 @@ class MainWindow(QMainWindow):
         menu_layout.addWidget(self.columns_combo)
         menu_layout.addWidget(self.bt2)
         menu_layout.addWidget(self.bt3)
+        menu_layout.addWidget(self.diff_btn)
+        menu_layout.addWidget(self.search_edit)
         menu_layout.addWidget(self.db_info_label)
         menu_layout.addStretch()
 
@@ -145,6 +176,8 @@ class MainWindow(QMainWindow):
         self.tab3 = QWidget()
         self.tab4 = QWidget()
         self.tab5 = QWidget()
+        self.tab6 = QWidget()
+        self.tab7 = QWidget()
 
         # Initialize tab layouts
         self.init_tab1()
@@ -152,6 +185,8 @@ class MainWindow(QMainWindow):
         self.init_tab3()
         self.init_tab4()
         self.init_tab5()
+        self.init_tab6()
+        self.init_tab7()
 
         # Add tabs to tab widget
         self.tab_widget.addTab(self.tab1, "Database Schema")
@@ -159,6 +194,8 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.tab3, "Column Data")
         self.tab_widget.addTab(self.tab4, "Tables Data")
         self.tab_widget.addTab(self.tab5, "Table Structure")
+        self.tab_widget.addTab(self.tab6, "Diff")
+        self.tab_widget.addTab(self.tab7, "Search")
 
         # Add layouts to main layout
         main_layout.addLayout(menu_layout)
@@ -189,6 +226,22 @@ class MainWindow(QMainWindow):
         self.table5 = QTableWidget()
         layout.addWidget(self.table5)
 
+    def init_tab6(self):
+        layout = QVBoxLayout(self.tab6)
+        self.table6 = QTableWidget()
+        self.table6.setColumnCount(len(self.DIFF_HEADERS))
+        self.table6.setHorizontalHeaderLabels(self.DIFF_HEADERS)
+        layout.addWidget(self.table6)
+
+    def init_tab7(self):
+        layout = QVBoxLayout(self.tab7)
+        self.table7 = QTableWidget()
+        self.table7.setColumnCount(2)
+        self.table7.setHorizontalHeaderLabels(['Location', 'Match'])
+        self.table7.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table7.cellDoubleClicked.connect(self.jump_to_search_hit)
+        layout.addWidget(self.table7)
+
     def set_connection(self):
         db_path, _ = QFileDialog.getOpenFileName(
             self, 'Open SQLite Database', '', 'SQLite Databases (*.db *.sqlite *.sqlite3)')
@@ -200,22 +253,30 @@ class MainWindow(QMainWindow):
                 self.bt1.setEnabled(True)
                 self.bt2.setEnabled(True)
                 self.bt3.setEnabled(True)
+                self.diff_btn.setEnabled(True)
+                self.search_edit.setEnabled(True)
 
                 # Update database info
                 self.db_info_label.setText(f'Connected: {db_path.split("/")[-1]}')
                 self.db_info_label.setStyleSheet('color: green; font-weight: bold;')
 
-                # Execute initial query and display in Tab1
-                self.execute_initial_query()
-
-                # Populate columns combo box with all columns from all tables
-                self.populate_columns_combo()
+                # Schema (Tab1) and the columns combo box are loaded first;
+                # the other tabs are prefetched once the user is idle
+                self.scheduler.submit('schema', 0, self.execute_initial_query)
+                self.scheduler.submit('columns_combo', None, self.populate_columns_combo)
+                self.schedule_table_names()
+                self.schedule_tables_data()
+                self.schedule_table_structure()
+                self.start_search_index(db_path)
 
                 QMessageBox.information(self, 'Success', 'Database connection established successfully!')
             else:
                 QMessageBox.critical(self, 'Error', 'Failed to connect to database!')
 
     def close_connection(self):
+        self.scheduler.cancel_all()
+        self.stop_diff()
+        self.stop_search_index()
         self.db_manager.close()
         self.connect_btn.setEnabled(True)
         self.close_btn.setEnabled(False)
@@ -223,6 +284,8 @@ class MainWindow(QMainWindow):
         self.columns_combo.setEnabled(False)
         self.bt2.setEnabled(False)
         self.bt3.setEnabled(False)
+        self.diff_btn.setEnabled(False)
+        self.search_edit.setEnabled(False)
 
         # Update database info
         self.db_info_label.setText('No database connected')
@@ -232,12 +295,181 @@ class MainWindow(QMainWindow):
         for table in [self.table1, self.table2, self.table3, self.table4, self.table5]:
             table.setRowCount(0)
             table.setColumnCount(0)
+        self.table6.setRowCount(0)
+        self.tab_widget.setTabText(5, "Diff")
+        self.table7.setRowCount(0)
+        self.search_summary = ''
+        self.tab_widget.setTabText(6, "Search")
 
         # Clear combo box
         self.columns_combo.clear()
 
         QMessageBox.information(self, 'Info', 'Database connection closed!')
 
+    def start_diff(self):
+        other_path, _ = QFileDialog.getOpenFileName(
+            self, 'Compare With Database', '', 'SQLite Databases (*.db *.sqlite *.sqlite3)')
+        if not other_path:
+            return
+
+        self.stop_diff()
+        self.table6.setRowCount(0)
+        self.tab_widget.setTabText(5, "Diff - running...")
+        self.tab_widget.setCurrentWidget(self.tab6)
+
+        # Both files are compared on a worker thread with their own read-only connections
+        self.diff_worker = DiffWorker(self.db_manager.current_db_path, other_path)
+        self.diff_worker.changes_found.connect(self.on_diff_changes)
+        self.diff_worker.finished_diff.connect(self.on_diff_finished)
+        self.diff_worker.failed.connect(self.on_diff_failed)
+        self.diff_worker.start()
+
+    def stop_diff(self):
+        if self.diff_worker is not None:
+            self.diff_worker.changes_found.disconnect()
+            self.diff_worker.finished_diff.disconnect()
+            self.diff_worker.failed.disconnect()
+            self.diff_worker.cancel()
+            self.diff_worker.wait()
+            self.diff_worker = None
+
+    def on_diff_changes(self, changes):
+        """Append a batch of changes streamed by the diff worker"""
+        # Batches already queued by a cancelled worker are ignored
+        if self.sender() is not self.diff_worker:
+            return
+        row = self.table6.rowCount()
+        self.table6.setRowCount(row + len(changes))
+        for change in changes:
+            for col_idx, value in enumerate(change):
+                self.table6.setItem(row, col_idx, QTableWidgetItem(str(value)))
+            row += 1
+        if row == len(changes):
+            self.table6.resizeColumnsToContents()
+
+    def on_diff_finished(self, total):
+        if self.sender() is not self.diff_worker:
+            return
+        self.tab_widget.setTabText(5, f"Diff ({total} changes)")
+        self.diff_worker = None
+
+    def on_diff_failed(self, message):
+        if self.sender() is not self.diff_worker:
+            return
+        self.tab_widget.setTabText(5, "Diff - Error")
+        self.diff_worker = None
+        QMessageBox.critical(self, 'Error', f'Failed to compare databases: {message}')
+
+    def start_search_index(self, db_path):
+        """Open the search index and bring it up to date in the background"""
+        try:
+            self.search_index = SearchIndex(db_path)
+        except sqlite3.Error as e:
+            print(f"Search index error: {e}")
+            return
+        self.search_worker = SearchIndexer(db_path)
+        self.search_worker.progress.connect(self.on_index_progress)
+        self.search_worker.finished_index.connect(self.on_index_finished)
+        self.search_worker.failed.connect(self.on_index_failed)
+        self.search_worker.start()
+
+    def stop_search_index(self):
+        if self.search_worker is not None:
+            self.search_worker.progress.disconnect()
+            self.search_worker.finished_index.disconnect()
+            self.search_worker.failed.disconnect()
+            self.search_worker.cancel()
+            self.search_worker.wait()
+            self.search_worker = None
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+        self.search_progress = ''
+
+    def on_index_progress(self, table, percent):
+        if self.sender() is not self.search_worker:
+            return
+        self.search_progress = f"indexing {table} {percent}%"
+        self.update_search_tab_text()
+
+    def on_index_finished(self, indexed):
+        if self.sender() is not self.search_worker:
+            return
+        self.search_worker = None
+        self.search_progress = ''
+        print(f'Search index updated: {indexed} rows indexed')
+        # Results found on a partial index are refreshed
+        self.schedule_search()
+
+    def on_index_failed(self, message):
+        if self.sender() is not self.search_worker:
+            return
+        self.search_worker = None
+        self.search_progress = 'index error'
+        self.update_search_tab_text()
+        print(f"Search index error: {message}")
+
+    def schedule_search(self):
+        if not self.search_edit.text().strip():
+            self.table7.setRowCount(0)
+            self.search_summary = ''
+            self.update_search_tab_text()
+            return
+        self.tab_widget.setCurrentWidget(self.tab7)
+        self.scheduler.submit('search', 6, self.execute_search, delay_ms=self.SEARCH_DELAY_MS)
+
+    def execute_search(self):
+        """Ranked hits of the global search in Tab7 (while indexing - from the part indexed so far)"""
+        if self.search_index is None:
+            return
+        start = time.perf_counter()
+        try:
+            hits = self.search_index.search(self.search_edit.text(), self.SEARCH_LIMIT)
+        except sqlite3.Error as e:
+            print(f"Search error: {e}")
+            hits = []
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.table7.setRowCount(len(hits))
+        for row_idx, (table, column, rowid, snippet) in enumerate(hits):
+            location = QTableWidgetItem(f"{table}.{column}/{rowid}")
+            location.setData(Qt.UserRole, (f"{table}.{column}", rowid))
+            self.table7.setItem(row_idx, 0, location)
+            self.table7.setItem(row_idx, 1, QTableWidgetItem(snippet))
+        self.table7.resizeColumnsToContents()
+        self.search_summary = f"{len(hits)} hits, {elapsed_ms:.1f} ms"
+        self.update_search_tab_text()
+
+    def update_search_tab_text(self):
+        details = ', '.join(part for part in (self.search_summary, self.search_progress) if part)
+        self.tab_widget.setTabText(6, f"Search ({details})" if details else "Search")
+
+    def jump_to_search_hit(self, row, column):
+        """Show the column of the hit in Tab3 and select the matching row"""
+        column_info, rowid = self.table7.item(row, 0).data(Qt.UserRole)
+        self.columns_combo.setCurrentText(column_info)
+        # Replaces the query the combo box change has just scheduled
+        self.scheduler.submit('column_data', 2, lambda: self.on_column_selected(column_info, rowid))
+        self.tab_widget.setCurrentWidget(self.tab3)
+
+    def closeEvent(self, event):
+        self.stop_diff()
+        self.stop_search_index()
+        super().closeEvent(event)
+
+    def schedule_table_names(self):
+        self.scheduler.submit('table_names', 1, self.execute_select_column)
+
+    def schedule_column_data(self, column_info):
+        self.scheduler.submit('column_data', 2, lambda: self.on_column_selected(column_info),
+                              delay_ms=self.COLUMN_SELECT_DELAY_MS)
+
+    def schedule_tables_data(self):
+        self.scheduler.submit('tables_data', 3, self.execute_query2)
+
+    def schedule_table_structure(self):
+        self.scheduler.submit('table_structure', 4, self.execute_query3)
+
     def execute_initial_query(self):
         """Execute SELECT * FROM sqlite_master and display in Tab1"""
         query = "SELECT * FROM sqlite_master"
@@ -256,8 +488,11 @@ class MainWindow(QMainWindow):
             self.display_data_in_table(self.table2, data, headers)
             self.tab_widget.setTabText(1, f"Table Names ({len(data)} tables)")
 
-    def on_column_selected(self, column_info):
-        """Execute query based on selected column and display in Tab3"""
+    def on_column_selected(self, column_info, rowid=None):
+        """Execute query based on selected column and display in Tab3
+
+        With rowid (a search hit) the rows are ordered by rowid and that row is selected.
+        """
         # Ignore the placeholder item and empty selections
         if not column_info or column_info == "-- Select a column --" or not self.db_manager.connection:
             self.table3.setRowCount(0)
@@ -272,11 +507,15 @@ class MainWindow(QMainWindow):
 
                 # Execute query to get data from the selected column
                 query = f"SELECT {column_name} FROM {table_name}"
+                if rowid is not None:
+                    query += " ORDER BY rowid"
                 data, headers = self.db_manager.execute_query(query)
 
                 if data and headers:
                     self.display_data_in_table(self.table3, data, headers)
                     self.tab_widget.setTabText(2, f"Column: {column_info}")
+                    if rowid is not None:
+                        self.select_row_by_rowid(table_name, rowid)
                 else:
                     # Clear table if no data
                     self.table3.setRowCount(0)
@@ -295,6 +534,12 @@ class MainWindow(QMainWindow):
             self.table3.setColumnCount(0)
             self.tab_widget.setTabText(2, "Column Data - Error")
 
+    def select_row_by_rowid(self, table_name, rowid):
+        data, _ = self.db_manager.execute_query(f"SELECT count(*) FROM {table_name} WHERE rowid < {int(rowid)}")
+        if data:
+            self.table3.selectRow(data[0][0])
+            self.table3.scrollToItem(self.table3.item(data[0][0], 0), QTableWidget.PositionAtCenter)
+
     def execute_query2(self):
         """Show data from all tables in Tab4"""
         if self.db_manager.connection:
@@ -399,7 +644,16 @@ class MainWindow(QMainWindow):
 
 
 def main():
+    slot_profiler = None
+    if os.environ.get("GUI_PROFILE"):
+        # Opt-in slot profiler shared by all labs (gui_profiler.py in the repository root)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+        from gui_profiler import install_from_env
+        slot_profiler = install_from_env(MainWindow, DatabaseManager)
+
     app = QApplication(sys.argv)
+    if slot_profiler is not None:
+        slot_profiler.start()
 
     # Set application style
     app.setStyle('Fusion')
@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import pathname2url
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+def quote(name):
+    """Quote an SQL identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def range_hash(text):
+    """64-bit digest of a key range rendered by SQL (one call per range, not per row)"""
+    if text is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def read_only_uri(path):
+    return 'file:' + pathname2url(os.path.abspath(path)) + '?mode=ro'
+
+
+class DatabaseDiff:
+    """Chunked-checksum diff of two SQLite files (Merkle-style).
+
+    Both files are opened read-only on one connection per thread (the second
+    one is ATTACHed as "other"). A table is split into primary-key ranges of about
+    CHUNK_ROWS rows; for each range SQL renders the rows with quote() and
+    group_concat, and range_hash digests the result in a single call. Only
+    ranges whose count or digest differ are split into FANOUT sub-ranges, and
+    ranges of at most LEAF_ROWS rows are compared row by row, so unchanged
+    data is read once by SQL and never reaches Python row by row. The ranges of
+    one level are checksummed in parallel (sqlite3 releases the GIL while a
+    query runs).
+
+    Only tables keyed by an INTEGER PRIMARY KEY are split into ranges: other
+    rowids are not stable (VACUUM may renumber them). Tables with another
+    declared PRIMARY KEY (including WITHOUT ROWID tables) are compared with
+    EXCEPT queries and matched by that key; tables without one are compared
+    as sets of whole rows.
+    """
+    CHUNK_ROWS = 20000
+    FANOUT = 16
+    LEAF_ROWS = 256
+
+    def __init__(self, path_a, path_b, workers=None):
+        self.path_a = path_a
+        self.path_b = path_b
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.cancelled = False
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        """Connection of the calling thread (both files, the second ATTACHed as "other")"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(read_only_uri(self.path_a), uri=True, check_same_thread=False)
+            connection.create_function('range_hash', 1, range_hash, deterministic=True)
+            connection.execute('ATTACH DATABASE ? AS other', (read_only_uri(self.path_b),))
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def cancel(self):
+        """Stop the diff, including queries that are running right now (from any thread)"""
+        self.cancelled = True
+        with self._lock:
+            for connection in self._connections:
+                connection.interrupt()
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+    def tables(self, schema):
+        rows = self.connection.execute(
+            f"SELECT name, sql FROM {schema}.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        return {name: sql or '' for name, sql in rows}
+
+    def columns(self, schema, table):
+        return self.connection.execute(f"PRAGMA {schema}.table_info({quote(table)})").fetchall()
+
+    def diff(self, emit):
+        """Compare all tables; emit(change) is called for each change found.
+
+        A change is a tuple (table, kind, key, values in this DB, values in the other DB)
+        where kind is 'added', 'removed', 'modified', 'table added', 'table removed'
+        or 'schema changed'.
+        """
+        tables_a = self.tables('main')
+        tables_b = self.tables('other')
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for table in sorted(set(tables_a) | set(tables_b)):
+                if self.cancelled:
+                    return
+                if table not in tables_b:
+                    emit((table, 'table removed', '', self.row_count('main', table), ''))
+                elif table not in tables_a:
+                    emit((table, 'table added', '', '', self.row_count('other', table)))
+                else:
+                    columns_a = [(c[1], c[2]) for c in self.columns('main', table)]
+                    columns_b = [(c[1], c[2]) for c in self.columns('other', table)]
+                    if columns_a != columns_b:
+                        emit((table, 'schema changed', '', columns_a, columns_b))
+                    else:
+                        self.diff_table(pool, table, tables_a[table], emit)
+
+    def row_count(self, schema, table):
+        return self.connection.execute(f"SELECT count(*) FROM {schema}.{quote(table)}").fetchone()[0]
+
+    def primary_key(self, table):
+        """Declared PRIMARY KEY columns in key order"""
+        return [c[1] for c in sorted(self.columns('main', table), key=lambda c: c[5]) if c[5]]
+
+    def diff_table(self, pool, table, sql, emit):
+        names = [quote(c[1]) for c in self.columns('main', table)]
+        columns = ', '.join(names)
+        pk = self.primary_key(table)
+        integer_key = (len(pk) == 1 and 'WITHOUT ROWID' not in sql.upper()
+                       and next(c[2] for c in self.columns('main', table) if c[1] == pk[0]).upper() == 'INTEGER')
+        if not integer_key:
+            self.diff_by_key(table, [quote(name) for name in pk], names, emit)
+            return
+        key = quote(pk[0])
+        row_text = " || ',' || ".join(f"quote({name})" for name in names)
+
+        lo, hi, rows = self.connection.execute(
+            f"SELECT min(lo), max(hi), max(n) FROM ("
+            f"SELECT min({key}) AS lo, max({key}) AS hi, count(*) AS n FROM main.{quote(table)} UNION ALL "
+            f"SELECT min({key}), max({key}), count(*) FROM other.{quote(table)})").fetchone()
+        if lo is None:
+            return
+        hi += 1
+        # Ranges are half-open [lo, hi); the first level holds about CHUNK_ROWS rows per range
+        step = max(1, (hi - lo) * self.CHUNK_ROWS // max(rows, 1))
+        ranges = self.split(lo, hi, step)
+        while ranges and not self.cancelled:
+            checksums = pool.map(lambda r: self.checksum(table, key, row_text, *r), ranges)
+            next_ranges = []
+            for (lo, hi), (count_a, digest_a, count_b, digest_b) in zip(ranges, checksums):
+                if count_a == count_b and digest_a == digest_b:
+                    continue
+                if max(count_a, count_b) <= self.LEAF_ROWS or hi - lo <= 1:
+                    self.diff_rows(table, key, columns, lo, hi, emit)
+                else:
+                    next_ranges.extend(self.split(lo, hi, max(1, -(-(hi - lo) // self.FANOUT))))
+            ranges = next_ranges
+
+    @staticmethod
+    def split(lo, hi, step):
+        return [(start, min(start + step, hi)) for start in range(lo, hi, step)]
+
+    def checksum(self, table, key, row_text, lo, hi):
+        """(count, digest) of [lo, hi) in both files"""
+        if self.cancelled:
+            return 0, 0, 0, 0
+        result = ()
+        for schema in ('main', 'other'):
+            result += tuple(self.connection.execute(
+                f"SELECT count(*), range_hash(group_concat(r, char(10))) FROM ("
+                f"SELECT {row_text} AS r FROM {schema}.{quote(table)} "
+                f"WHERE {key} >= ? AND {key} < ? ORDER BY {key})", (lo, hi)).fetchone())
+        return result
+
+    def fetch_rows(self, schema, table, key, columns, lo, hi):
+        rows = self.connection.execute(
+            f"SELECT {key}, {columns} FROM {schema}.{quote(table)} WHERE {key} >= ? AND {key} < ?", (lo, hi))
+        return {row[0]: row[1:] for row in rows}
+
+    def diff_rows(self, table, key, columns, lo, hi, emit):
+        rows_a = self.fetch_rows('main', table, key, columns, lo, hi)
+        rows_b = self.fetch_rows('other', table, key, columns, lo, hi)
+        for row_key in sorted(set(rows_a) | set(rows_b)):
+            if row_key not in rows_b:
+                emit((table, 'removed', row_key, rows_a[row_key], ''))
+            elif row_key not in rows_a:
+                emit((table, 'added', row_key, '', rows_b[row_key]))
+            elif rows_a[row_key] != rows_b[row_key]:
+                emit((table, 'modified', row_key, rows_a[row_key], rows_b[row_key]))
+
+    def diff_by_key(self, table, key_names, names, emit):
+        """Rows that differ (EXCEPT both ways), matched by the declared key if there is one"""
+        columns = ', '.join(names)
+        key_positions = [names.index(name) for name in key_names]
+
+        def changed(first, second):
+            rows = self.connection.execute(
+                f"SELECT {columns} FROM {first}.{quote(table)} EXCEPT SELECT {columns} FROM {second}.{quote(table)}")
+            return {tuple(row[i] for i in key_positions) if key_positions else row: row for row in rows}
+
+        rows_a = changed('main', 'other')
+        rows_b = changed('other', 'main')
+        for row_key in sorted(set(rows_a) | set(rows_b), key=repr):
+            if self.cancelled:
+                return
+            shown_key = (row_key[0] if len(row_key) == 1 else row_key) if key_positions else ''
+            if row_key not in rows_b:
+                emit((table, 'removed', shown_key, rows_a[row_key], ''))
+            elif row_key not in rows_a:
+                emit((table, 'added', shown_key, '', rows_b[row_key]))
+            else:
+                emit((table, 'modified', shown_key, rows_a[row_key], rows_b[row_key]))
+
+
+class DiffWorker(QThread):
+    """Runs DatabaseDiff in the background and streams changes in batches"""
+    changes_found = pyqtSignal(list)
+    finished_diff = pyqtSignal(int)     # total number of changes
+    failed = pyqtSignal(str)
+
+    BATCH_SIZE = 200
+
+    def __init__(self, path_a, path_b):
+        super().__init__()
+        self.path_a = path_a
+        self.path_b = path_b
+        self.differ = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.differ is not None:
+            self.differ.cancel()
+
+    def run(self):
+        batch = []
+        total = 0
+
+        def emit(change):
+            nonlocal total
+            batch.append(change)
+            total += 1
+            if len(batch) >= self.BATCH_SIZE:
+                self.changes_found.emit(batch[:])
+                batch.clear()
+
+        try:
+            self.differ = DatabaseDiff(self.path_a, self.path_b)
+            self.differ.cancelled = self.cancelled
+            try:
+                self.differ.diff(emit)
+            finally:
+                self.differ.close()
+        except sqlite3.Error as e:
+            # An interrupted query after cancel() is not an error
+            if not self.cancelled:
+                self.failed.emit(str(e))
+            return
+        if self.cancelled:
+            return
+        if batch:
+            self.changes_found.emit(batch)
+        self.finished_diff.emit(total)
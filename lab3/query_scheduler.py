@@ -0,0 +1,96 @@
+from PyQt5.QtCore import QObject, QTimer, QEvent
+from PyQt5.QtWidgets import QApplication
+
+
+class QueryScheduler(QObject):
+    """Runs tab queries in order of visibility.
+
+    Work for the visible tab (and for widgets outside the tabs) runs on the next
+    event loop iteration; work for hidden tabs waits until the user has been idle
+    for IDLE_MS and then runs one task per idle tick. A new request with the same
+    key replaces the pending one, so superseded requests never execute. Queries
+    still run on the GUI thread because DatabaseManager shares one connection.
+    """
+    IDLE_MS = 400
+    # Pause between two idle prefetch tasks, so input is processed in between
+    PREFETCH_GAP_MS = 10
+
+    # User input that postpones idle prefetching
+    ACTIVITY_EVENTS = (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.Wheel)
+
+    def __init__(self, tab_widget, parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.pending = {}      # key -> (tab index or None, callable)
+        self.executed = 0
+        self.superseded = 0
+
+        self.dispatch_timer = QTimer(self)
+        self.dispatch_timer.setSingleShot(True)
+        self.dispatch_timer.timeout.connect(self.run_visible)
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.run_idle)
+
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        app = QApplication.instance()
+        if app is not None:
+            app.installEventFilter(self)
+
+    def submit(self, key, tab_index, func, delay_ms=0):
+        """Queue func for the given tab (None - not tied to a tab, always visible).
+
+        delay_ms lets rapid repeated requests (e.g. combo box changes) replace
+        each other before any of them runs.
+        """
+        if key in self.pending:
+            self.superseded += 1
+        self.pending[key] = (tab_index, func)
+        if self.is_visible(tab_index):
+            self.dispatch_timer.start(delay_ms)
+        else:
+            self.idle_timer.start(self.IDLE_MS)
+
+    def cancel_all(self):
+        self.pending.clear()
+        self.dispatch_timer.stop()
+        self.idle_timer.stop()
+
+    def is_visible(self, tab_index):
+        return tab_index is None or tab_index == self.tab_widget.currentIndex()
+
+    def run_visible(self):
+        # Current tab first, then work outside the tabs
+        current = self.tab_widget.currentIndex()
+        keys = [key for key, (tab, func) in self.pending.items() if tab == current]
+        keys += [key for key, (tab, func) in self.pending.items() if tab is None]
+        for key in keys:
+            self.run(key)
+        if self.pending:
+            self.idle_timer.start(self.IDLE_MS)
+
+    def run_idle(self):
+        """Prefetch one hidden tab, then yield to the event loop"""
+        if self.dispatch_timer.isActive():
+            self.idle_timer.start(self.IDLE_MS)
+            return
+        if self.pending:
+            self.run(next(iter(self.pending)))
+        if self.pending:
+            self.idle_timer.start(self.PREFETCH_GAP_MS)
+
+    def run(self, key):
+        tab_index, func = self.pending.pop(key)
+        self.executed += 1
+        func()
+
+    def on_tab_changed(self, index):
+        # Promote pending work of the tab that just became visible
+        if any(tab == index for tab, func in self.pending.values()):
+            self.dispatch_timer.start(0)
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.ACTIVITY_EVENTS and self.idle_timer.isActive():
+            self.idle_timer.start(self.IDLE_MS)
+        return False
@@ -0,0 +1,273 @@
+import re
+import sqlite3
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from db_diff import quote, range_hash, read_only_uri
+
+
+def sidecar_path(db_path):
+    """Index file stored next to the database"""
+    return db_path + '.search.db'
+
+
+def column_affinity(declared_type):
+    """Type affinity of a column by SQLite rules (an untyped column has BLOB affinity)"""
+    declared_type = (declared_type or '').upper()
+    if 'INT' in declared_type:
+        return 'INTEGER'
+    if any(name in declared_type for name in ('CHAR', 'CLOB', 'TEXT')):
+        return 'TEXT'
+    if not declared_type or 'BLOB' in declared_type:
+        return 'BLOB'
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'REAL'
+    return 'NUMERIC'
+
+
+def may_hold_text(declared_type):
+    """Columns worth indexing: untyped and NUMERIC (dates) columns often hold text too"""
+    return column_affinity(declared_type) in ('TEXT', 'BLOB', 'NUMERIC')
+
+
+def match_query(text):
+    """User input -> FTS5 query: every word is a quoted prefix term (no FTS syntax errors)"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+class SearchIndex:
+    """FTS5 index over the text values of a database, kept in a sidecar file.
+
+    Columns with TEXT, NUMERIC or no declared type are indexed, and only the
+    values actually stored as text (typeof = 'text'). Every non-empty value is
+    one row of the "entries" table together with its table, column and rowid.
+    The source database is ATTACHed read-only and copied with
+    INSERT ... SELECT, so rows never pass through Python.
+
+    Rows are indexed in rowid chunks of CHUNK_ROWS rows. Each table remembers
+    the last indexed rowid (watermark), and each chunk its rowid range, the
+    range of its entries and a fingerprint: the row count and a digest of the
+    rowids and indexed values (as in DatabaseDiff.checksum). An update indexes
+    the rows above the watermark and reindexes alone every chunk whose
+    fingerprint changed - rows deleted, inserted or updated in place, including
+    a deleted row whose rowid was reused. A chunk left empty is kept, and the
+    watermark drops back to the last remaining rowid when the tail of a table
+    is deleted. A table is reindexed from scratch only when its indexed
+    columns change.
+    """
+    SCHEMA_VERSION = 3
+    # Source rows indexed per transaction (progress and cancellation granularity)
+    CHUNK_ROWS = 5000
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(sidecar_path(db_path), timeout=30)
+        # WAL lets the GUI search while the background thread writes
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.create_function('range_hash', 1, range_hash, deterministic=True)
+        self.create_schema()
+
+    def create_schema(self):
+        with self.connection:
+            if self.connection.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                for table in ('entries', 'indexed_tables', 'chunks'):
+                    self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5("
+                "value, tbl UNINDEXED, col UNINDEXED, row_id UNINDEXED, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS indexed_tables (tbl TEXT PRIMARY KEY, columns TEXT, watermark INTEGER)")
+            # Source rows lo < rowid <= hi; their entries have rowids first_entry..last_entry
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "tbl TEXT, lo INTEGER, hi INTEGER, row_count INTEGER, digest INTEGER, "
+                "first_entry INTEGER, last_entry INTEGER, PRIMARY KEY (tbl, lo))")
+            self.connection.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+    def close(self):
+        self.connection.close()
+
+    # --- Indexing ---
+    def update(self, progress=None, is_cancelled=lambda: False):
+        """Bring the index up to date; returns the number of source rows indexed.
+
+        progress(table, percent) is called after every chunk.
+        """
+        self.connection.execute('ATTACH DATABASE ? AS src', (read_only_uri(self.db_path),))
+        try:
+            tables = self.text_tables()
+            indexed = 0
+            for table in list(self.indexed_state()):
+                if table not in tables:
+                    self.drop_table(table)
+            for table, columns in tables.items():
+                if is_cancelled():
+                    break
+                indexed += self.update_table(table, columns, progress, is_cancelled)
+            return indexed
+        finally:
+            self.connection.execute('DETACH DATABASE src')
+
+    def text_tables(self):
+        """{table: [columns that may hold text]} of the source database (rowid tables only)"""
+        tables = {}
+        rows = self.connection.execute(
+            "SELECT name, sql FROM src.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'").fetchall()
+        for name, sql in rows:
+            if 'WITHOUT ROWID' in (sql or '').upper():
+                continue
+            columns = [c[1] for c in self.connection.execute(f"PRAGMA src.table_info({quote(name)})")
+                       if may_hold_text(c[2])]
+            if columns:
+                tables[name] = columns
+        return tables
+
+    def indexed_state(self):
+        return {tbl: (columns, watermark) for tbl, columns, watermark
+                in self.connection.execute('SELECT tbl, columns, watermark FROM indexed_tables')}
+
+    def drop_table(self, table):
+        with self.connection:
+            chunks = self.connection.execute(
+                'SELECT first_entry, last_entry FROM chunks WHERE tbl = ?', (table,)).fetchall()
+            self.connection.executemany('DELETE FROM entries WHERE rowid BETWEEN ? AND ?', chunks)
+            self.connection.execute('DELETE FROM chunks WHERE tbl = ?', (table,))
+            self.connection.execute('DELETE FROM indexed_tables WHERE tbl = ?', (table,))
+
+    def update_table(self, table, columns, progress, is_cancelled):
+        source = f"src.{quote(table)}"
+        columns_key = ','.join(columns)
+        columns_state, watermark = self.indexed_state().get(table, (None, None))
+        indexed = 0
+        if watermark is not None and columns_state != columns_key:
+            self.drop_table(table)
+            watermark = None
+        if watermark is None:
+            watermark = -2 ** 63
+            with self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO indexed_tables VALUES (?, ?, ?)', (table, columns_key, watermark))
+        else:
+            refreshed, watermark = self.refresh_chunks(table, columns, watermark, is_cancelled)
+            indexed += refreshed
+
+        last_rowid = self.connection.execute(f"SELECT max(rowid) FROM {source}").fetchone()[0]
+        if last_rowid is None or last_rowid <= watermark:
+            return indexed
+        first_rowid = self.connection.execute(
+            f"SELECT min(rowid) FROM {source} WHERE rowid > ?", (watermark,)).fetchone()[0]
+
+        while watermark < last_rowid and not is_cancelled():
+            upper = self.connection.execute(
+                f"SELECT rowid FROM {source} WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                (watermark, self.CHUNK_ROWS - 1)).fetchone()
+            upper = upper[0] if upper else last_rowid
+            # The chunk and the watermark are committed together, an interrupted update resumes here
+            with self.connection:
+                indexed += self.index_chunk(table, columns, watermark, upper)
+                watermark = upper
+                self.connection.execute('UPDATE indexed_tables SET watermark = ? WHERE tbl = ?', (watermark, table))
+            if progress is not None:
+                done = (watermark - first_rowid + 1) / max(last_rowid - first_rowid + 1, 1)
+                progress(table, int(done * 100))
+        return indexed
+
+    def refresh_chunks(self, table, columns, watermark, is_cancelled):
+        """Reindex the chunks below the watermark whose fingerprint changed.
+
+        Returns (rows reindexed, watermark); the watermark is lowered to the
+        last remaining rowid when rows at the end of the table were deleted.
+        """
+        chunks = self.connection.execute(
+            'SELECT lo, hi, row_count, digest, first_entry, last_entry FROM chunks WHERE tbl = ? ORDER BY lo',
+            (table,)).fetchall()
+        indexed = 0
+        for lo, hi, row_count, digest, first_entry, last_entry in chunks:
+            if is_cancelled():
+                return indexed, watermark
+            if self.fingerprint(table, columns, lo, hi) == (row_count, digest):
+                continue
+            with self.connection:
+                self.connection.execute('DELETE FROM entries WHERE rowid BETWEEN ? AND ?', (first_entry, last_entry))
+                indexed += self.index_chunk(table, columns, lo, hi)
+
+        # Rowids above the last remaining row are reused by the next INSERT, so
+        # they must be above the watermark again. The chunks there are empty now.
+        last_rowid = self.connection.execute(f"SELECT max(rowid) FROM src.{quote(table)}").fetchone()[0]
+        last_rowid = -2 ** 63 if last_rowid is None else last_rowid
+        if last_rowid < watermark:
+            watermark = last_rowid
+            with self.connection:
+                self.connection.execute('DELETE FROM chunks WHERE tbl = ? AND lo >= ?', (table, watermark))
+                self.connection.execute(
+                    'UPDATE chunks SET hi = ? WHERE tbl = ? AND hi > ?', (watermark, table, watermark))
+                self.connection.execute('UPDATE indexed_tables SET watermark = ? WHERE tbl = ?', (watermark, table))
+        return indexed, watermark
+
+    def fingerprint(self, table, columns, lo, hi):
+        """(row count, digest of rowids and indexed values) of source rows lo < rowid <= hi"""
+        row_text = " || ',' || ".join(['rowid'] + [f"quote({quote(column)})" for column in columns])
+        return tuple(self.connection.execute(
+            f"SELECT count(*), range_hash(group_concat(r, char(10))) FROM ("
+            f"SELECT {row_text} AS r FROM src.{quote(table)} "
+            f"WHERE rowid > ? AND rowid <= ? ORDER BY rowid)", (lo, hi)).fetchone())
+
+    def index_chunk(self, table, columns, lo, hi):
+        """Index source rows lo < rowid <= hi (inside the caller's transaction)"""
+        source = f"src.{quote(table)}"
+        first_entry = self.last_entry() + 1
+        for column in columns:
+            self.connection.execute(
+                f"INSERT INTO entries (value, tbl, col, row_id) "
+                f"SELECT {quote(column)}, ?, ?, rowid FROM {source} "
+                f"WHERE rowid > ? AND rowid <= ? AND typeof({quote(column)}) = 'text' AND {quote(column)} <> ''",
+                (table, column, lo, hi))
+        rows, digest = self.fingerprint(table, columns, lo, hi)
+        # An emptied chunk is kept (row_count 0) so rows reinserted into its range are noticed
+        self.connection.execute(
+            'INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (table, lo, hi, rows, digest, first_entry, self.last_entry()))
+        return rows
+
+    def last_entry(self):
+        row = self.connection.execute('SELECT rowid FROM entries ORDER BY rowid DESC LIMIT 1').fetchone()
+        return row[0] if row else 0
+
+    # --- Search ---
+    def search(self, text, limit=200):
+        """Best matches first: [(table, column, rowid, snippet)]"""
+        query = match_query(text)
+        if not query:
+            return []
+        return self.connection.execute(
+            "SELECT tbl, col, row_id, snippet(entries, 0, '[', ']', '...', 12) FROM entries "
+            "WHERE entries MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+
+
+class SearchIndexer(QThread):
+    """Builds or updates the search index in the background"""
+    progress = pyqtSignal(str, int)     # table, percent
+    finished_index = pyqtSignal(int)    # number of rows indexed
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            index = SearchIndex(self.db_path)
+            try:
+                indexed = index.update(self.progress.emit, lambda: self.cancelled)
+            finally:
+                index.close()
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
+            return
+        self.finished_index.emit(indexed)
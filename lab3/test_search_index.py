@@ -0,0 +1,76 @@
+"""Tests of the incremental SearchIndex update against a temporary database.
+
+Run: python -m pytest test_search_index.py (or python -m unittest test_search_index)
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from search_index import SearchIndex
+
+
+class SearchIndexUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, 'source.db')
+        self.source = sqlite3.connect(self.db_path)
+        self.source.execute('CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)')
+        self.index = None
+
+    def tearDown(self):
+        if self.index is not None:
+            self.index.close()
+        self.source.close()
+        self.directory.cleanup()
+
+    def fill(self, rows):
+        with self.source:
+            self.source.executemany('INSERT INTO notes (body) VALUES (?)', ((f'row{i}',) for i in range(rows)))
+
+    def execute(self, sql, *args):
+        with self.source:
+            self.source.execute(sql, args)
+
+    def update(self):
+        if self.index is None:
+            self.index = SearchIndex(self.db_path)
+        return self.index.update()
+
+    def found(self, text):
+        return [row_id for _table, _column, row_id, _snippet in self.index.search(text)]
+
+    def test_rowid_reused_after_tail_delete_is_indexed(self):
+        self.fill(20001)
+        self.update()
+        self.execute('DELETE FROM notes WHERE id > 15000')
+        self.update()
+        self.execute("INSERT INTO notes (body) VALUES ('afterdel')")
+        self.update()
+        self.assertEqual(self.found('afterdel'), [15001])
+
+    def test_last_row_replaced_with_same_rowid(self):
+        self.fill(10)
+        self.update()
+        self.execute('DELETE FROM notes WHERE id = 10')
+        self.execute("INSERT INTO notes (body) VALUES ('swapped')")
+        self.update()
+        self.assertEqual(self.found('swapped'), [10])
+        self.assertEqual(self.found('row9'), [])
+
+    def test_value_updated_in_place(self):
+        self.fill(12000)
+        self.update()
+        self.execute("UPDATE notes SET body = 'replacement' WHERE id = 7000")
+        self.assertEqual(self.update(), 5000)
+        self.assertEqual(self.found('replacement'), [7000])
+        self.assertEqual(self.found('row6999'), [])
+
+    def test_unchanged_table_is_not_reindexed(self):
+        self.fill(12000)
+        self.assertEqual(self.update(), 12000)
+        self.assertEqual(self.update(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
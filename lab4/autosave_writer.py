@@ -0,0 +1,106 @@
+import os
+import base64
+import hashlib
+import threading
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+# --- Фоновая запись PNG-бэкапа ---
+class AutosaveWriter(QThread):
+    """Очередь записи автосохранения в отдельном потоке.
+
+    В очереди хранится только последний ещё не записанный снимок; одинаковые
+    по содержимому снимки не записываются повторно, а файл заменяется атомарно
+    через временный файл и os.replace. Тот же поток выполняет сжатие истории
+    (submit_compaction), чтобы перезапись pack-файла не останавливала GUI.
+    """
+    written = pyqtSignal(float)   # задержка записи, мс
+    skipped = pyqtSignal()
+    failed = pyqtSignal(str)
+    compacted = pyqtSignal()
+    compaction_failed = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self._path = path
+        self._pending = None
+        self._compaction = None
+        self._stopping = False
+        self._last_digest = None
+        self._condition = threading.Condition()
+
+    def submit(self, image_data_url):
+        """Постановка снимка в очередь (вызывается из GUI-потока, O(1))"""
+        with self._condition:
+            self._pending = image_data_url
+            self._condition.notify()
+
+    def submit_compaction(self, compact):
+        """Постановка сжатия истории в очередь: compact() выполняется в потоке записи"""
+        with self._condition:
+            self._compaction = compact
+            self._condition.notify()
+
+    def stop(self):
+        """Дописывает последний снимок и выполняет сжатие из очереди, затем завершает поток"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def run(self):
+        if os.path.exists(self._path):
+            try:
+                with open(self._path, 'rb') as f:
+                    self._last_digest = self._digest(f.read())
+            except IOError:
+                pass
+
+        while True:
+            with self._condition:
+                while self._pending is None and self._compaction is None and not self._stopping:
+                    self._condition.wait()
+                if self._pending is None and self._compaction is None:
+                    return
+                image_data_url, self._pending = self._pending, None
+                compact, self._compaction = self._compaction, None
+            if image_data_url is not None:
+                self._write(image_data_url)
+            if compact is not None:
+                self._compact(compact)
+
+    def _compact(self, compact):
+        try:
+            compact()
+        except (KeyError, ValueError, IOError) as e:
+            # KeyError - снимок ссылается на блок, которого нет в pack-файле
+            self.compaction_failed.emit(str(e))
+            return
+        self.compacted.emit()
+
+    def _write(self, image_data_url):
+        start = time.perf_counter()
+        try:
+            header, encoded = image_data_url.split(",", 1)
+            image_data = base64.b64decode(encoded)
+            digest = self._digest(image_data)
+            if digest == self._last_digest:
+                self.skipped.emit()
+                return
+            temp_path = self._path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(image_data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._path)
+            self._last_digest = digest
+        except (ValueError, IndexError, IOError) as e:
+            self.failed.emit(str(e))
+            return
+        self.written.emit((time.perf_counter() - start) * 1000)
@@ -0,0 +1,187 @@
+"""Headless-бенчмарк отрисовки и сохранения графического редактора.
+
+Запуск: python bench_drawing.py [--strokes 10,100,1000] [--history 50,500,10000] [--json results.json]
+mainWindow.qml загружается на платформе offscreen с программным рендером;
+на холст выводятся синтетические наборы штрихов, замеряются кадры Canvas,
+toDataURL, saveCanvas/saveStrokes и запуск бэкенда с историей разной длины.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("QT_QUICK_BACKEND", "software")
+
+from PyQt5.QtCore import (QObject, QCoreApplication, QEvent, QEventLoop, QTimer, QMetaObject,
+                          Q_ARG, Q_RETURN_ARG)
+from PyQt5.QtGui import QGuiApplication
+from PyQt5.QtQml import QQmlApplicationEngine
+
+from main_complete import DrawingBackend
+from stroke_codec import encode_strokes
+from snapshot_store import TIMESTAMP_FORMAT
+
+QML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mainWindow.qml")
+# Сколько раз повторяется каждый замер
+SAMPLES = 5
+COLORS = ["#ff0000", "#00ff00", "#0000ff", "#000000"]
+
+
+def synthetic_strokes(count, width, height, points_per_stroke=30, seed=0):
+    """Штрихи-случайные блуждания внутри холста"""
+    rng = random.Random(seed)
+    strokes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        points = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + rng.uniform(-8, 8), 0), width)
+            y = min(max(y + rng.uniform(-8, 8), 0), height)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+        strokes.append({"color": rng.choice(COLORS), "width": rng.randint(1, 5), "points": points})
+    return strokes
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "p50_ms": ordered[len(ordered) // 2],
+        "max_ms": ordered[-1],
+        "samples": len(ordered),
+    }
+
+
+def wait_for_paint(canvas, action, timeout_ms=10000):
+    """Кадр холста: (время до сигнала painted, процессорное время за этот интервал), мс.
+
+    Настенное время включает ожидание следующего кадра цикла рендера (~16 мс),
+    процессорное - в основном стоимость onPaint и растеризации.
+    """
+    loop = QEventLoop()
+    canvas.painted.connect(loop.quit)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    start, start_cpu = time.perf_counter(), time.process_time()
+    action()
+    loop.exec_()
+    elapsed = (time.perf_counter() - start) * 1000
+    elapsed_cpu = (time.process_time() - start_cpu) * 1000
+    canvas.painted.disconnect(loop.quit)
+    return elapsed, elapsed_cpu
+
+
+def call(canvas, method, *args):
+    QMetaObject.invokeMethod(canvas, method, *[Q_ARG("QVariant", arg) for arg in args])
+
+
+def bench_canvas(stroke_counts):
+    """Кадры Canvas, toDataURL и сохранение в историю для наборов штрихов разного размера"""
+    results = {}
+    with tempfile.TemporaryDirectory() as history_dir:
+        engine = QQmlApplicationEngine()
+        backend = DrawingBackend(history_dir, max_entries=None)
+        engine.rootContext().setContextProperty("drawingBackend", backend)
+        engine.addImageProvider("thumbnails", backend.thumbnailProvider)
+        engine.addImageProvider("canvas", backend.canvasImageProvider)
+        engine.load(QML_PATH)
+        canvas = engine.rootObjects()[0].findChild(QObject, "drawingCanvas")
+        width, height = int(canvas.property("width")), int(canvas.property("height"))
+        QGuiApplication.processEvents()
+
+        for count in stroke_counts:
+            strokes = synthetic_strokes(count, width, height)
+            canvas.setProperty("strokes", strokes)
+            canvas.setProperty("imageToLoad", "")
+            full_frames, stroke_frames, data_url_times, save_canvas_times, save_strokes_times = [], [], [], [], []
+            for i in range(SAMPLES):
+                full_frames.append(wait_for_paint(canvas, lambda: call(canvas, "redrawAll")))
+                stroke = synthetic_strokes(1, width, height, seed=count + i)[0]
+                stroke_frames.append(wait_for_paint(canvas, lambda: call(canvas, "commitStroke", stroke)))
+                strokes.append(stroke)
+
+                start = time.perf_counter()
+                data_url = QMetaObject.invokeMethod(canvas, "toDataURL", Q_RETURN_ARG("QString"),
+                                                    Q_ARG("QString", "image/png"))
+                data_url_times.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                backend.saveCanvas(data_url)
+                save_canvas_times.append((time.perf_counter() - start) * 1000)
+
+                strokes_json = json.dumps(strokes)
+                start = time.perf_counter()
+                backend.saveStrokes(strokes_json, width, height)
+                save_strokes_times.append((time.perf_counter() - start) * 1000)
+
+            results[str(count)] = {
+                "full_repaint": summarize([wall for wall, cpu in full_frames]),
+                "full_repaint_cpu": summarize([cpu for wall, cpu in full_frames]),
+                "incremental_stroke": summarize([wall for wall, cpu in stroke_frames]),
+                "incremental_stroke_cpu": summarize([cpu for wall, cpu in stroke_frames]),
+                "to_data_url": summarize(data_url_times),
+                "save_canvas": summarize(save_canvas_times),
+                "save_strokes": summarize(save_strokes_times),
+            }
+
+        backend.shutdown()
+        # Движок удаляется из цикла событий Qt (без удержания GIL), иначе его деструктор
+        # может ждать поток загрузчика, который создаёт миниатюры в Python-коде провайдера
+        engine.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    return results
+
+
+def bench_history(history_sizes):
+    """Запуск бэкенда (чтение индекса, _load_history) при истории разной длины"""
+    results = {}
+    for size in history_sizes:
+        with tempfile.TemporaryDirectory() as history_dir:
+            # Наполняем историю векторными снимками напрямую через хранилище
+            backend = DrawingBackend(history_dir, max_entries=None)
+            store = backend._store
+            for stroke in synthetic_strokes(size, 700, 500, points_per_stroke=10):
+                store.append(time.strftime(TIMESTAMP_FORMAT), encode_strokes([stroke], 700, 500), kind="strokes")
+            backend.shutdown()
+
+            startup_times = []
+            for _ in range(SAMPLES):
+                start = time.perf_counter()
+                backend = DrawingBackend(history_dir, max_entries=None)
+                startup_times.append((time.perf_counter() - start) * 1000)
+                backend.shutdown()
+            results[str(size)] = {"backend_startup": summarize(startup_times)}
+    return results
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки и сохранения графического редактора")
+    parser.add_argument("--strokes", type=parse_sizes, default=[10, 100, 1000, 5000],
+                        help="размеры наборов штрихов через запятую")
+    parser.add_argument("--history", type=parse_sizes, default=[50, 500, 2000, 10000],
+                        help="длины истории через запятую")
+    parser.add_argument("--json", help="файл для результатов в формате JSON")
+    args = parser.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    results = {"canvas": bench_canvas(args.strokes), "history": bench_history(args.history)}
+
+    for count, stats in results["canvas"].items():
+        print(f"strokes={count:>6} " + " ".join(
+            f"{name}={value['p50_ms']:.1f}ms" for name, value in stats.items()))
+    for size, stats in results["history"].items():
+        print(f"history={size:>6} backend_startup={stats['backend_startup']['p50_ms']:.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
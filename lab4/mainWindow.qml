@@ -9,7 +9,10 @@ ApplicationWindow {
     height: 700
     title: "Графический редактор с двойной системой сохранения"
 
-    // --- Таймер для автосохранения в историю (saves.json) ---
+    // Ревизия холста, сохранённая последним PNG-бэкапом
+    property int autoSavedRevision: -1
+
+    // --- Таймер для автосохранения в историю ---
     Timer {
         id: autoSaveHistoryTimer
         interval: 60000 // 1 минута по умолчанию
@@ -17,7 +20,7 @@ ApplicationWindow {
         repeat: true
         onTriggered: {
             console.log("Автосохранение в историю...")
-            drawingBackend.saveCanvas(canvas.toDataURL())
+            root.saveToHistory()
         }
     }
 
@@ -28,11 +31,35 @@ ApplicationWindow {
         running: true // Запускаем сразу и всегда
         repeat: true
         onTriggered: {
+            // Холст не менялся с прошлого бэкапа - не тратим время на toDataURL
+            if (canvas.revision === root.autoSavedRevision) return
+            root.autoSavedRevision = canvas.revision
             console.log("Автосохранение в PNG...")
             drawingBackend.autoSaveToPng(canvas.toDataURL())
         }
     }
 
+    // Сохранение в историю: векторные штрихи, а если на холсте загружен растр - PNG
+    function saveToHistory() {
+        if (canvas.imageToLoad === "") {
+            drawingBackend.saveStrokes(JSON.stringify(canvas.strokes), canvas.width, canvas.height)
+        } else {
+            drawingBackend.saveCanvas(canvas.toDataURL())
+        }
+    }
+
+    // Во время рисования штрих ещё не в журнале - отмена игнорируется
+    function undo() {
+        if (!canvas.isDrawing) drawingBackend.undo()
+    }
+
+    function redo() {
+        if (!canvas.isDrawing) drawingBackend.redo()
+    }
+
+    Shortcut { sequences: [StandardKey.Undo]; onActivated: root.undo() }
+    Shortcut { sequences: [StandardKey.Redo]; onActivated: root.redo() }
+
     function setAutoSaveHistoryTimer(intervalMs) {
         autoSaveHistoryTimer.interval = intervalMs
         if (intervalMs > 0) {
@@ -85,8 +112,12 @@ ApplicationWindow {
                 color: "white"
                 border.color: "grey"
 
+                // Слой завершённых штрихов: холст не очищается между отрисовками,
+                // поэтому каждый новый штрих рисуется поверх уже готового изображения один раз.
+                // Полная перерисовка - только при очистке, загрузке и изменении размера.
                 Canvas {
                     id: canvas
+                    objectName: "drawingCanvas"
                     anchors.fill: parent
                     anchors.margins: 1
 
@@ -96,40 +127,143 @@ ApplicationWindow {
                     property var currentStrokePoints: []
                     property string imageToLoad: ""
                     property bool isDrawing: false
+                    // Прореживание ввода: точки ближе minPointDistance к предыдущей отбрасываются
+                    property real minPointDistance: 1.5
+                    property int rawPointCount: 0
+                    property int paintedStrokes: 0
+                    // Счётчик изменений содержимого холста
+                    property int revision: 0
+                    property bool fullRepaint: true
+                    // Растр контрольной точки журнала отмены и число штрихов, уже входящих в него
+                    property string checkpointImage: ""
+                    property int checkpointStrokes: 0
 
-                    onImageLoaded: requestPaint()
+                    function drawStroke(ctx, color, width, points, from) {
+                        if (points.length === 0) return;
+                        ctx.strokeStyle = color; ctx.lineWidth = width; ctx.lineCap = "round"; ctx.lineJoin = "round";
+                        var start = Math.max(0, from);
+                        ctx.beginPath(); ctx.moveTo(points[start].x, points[start].y);
+                        for (var j = start + 1; j < points.length; j++) { ctx.lineTo(points[j].x, points[j].y); }
+                        ctx.stroke();
+                    }
+
+                    // Ограничивающий прямоугольник точек с запасом на толщину линии
+                    function pointsRect(points, from, width) {
+                        var minX = points[from].x, maxX = minX, minY = points[from].y, maxY = minY;
+                        for (var i = from + 1; i < points.length; i++) {
+                            minX = Math.min(minX, points[i].x); maxX = Math.max(maxX, points[i].x);
+                            minY = Math.min(minY, points[i].y); maxY = Math.max(maxY, points[i].y);
+                        }
+                        var pad = width + 1;
+                        return Qt.rect(minX - pad, minY - pad, maxX - minX + 2 * pad, maxY - minY + 2 * pad);
+                    }
+
+                    function redrawAll() {
+                        revision++;
+                        fullRepaint = true;
+                        requestPaint();
+                    }
+
+                    function commitStroke(stroke) {
+                        revision++;
+                        strokes.push(stroke);
+                        markDirty(pointsRect(stroke.points, 0, stroke.width));
+                    }
+
+                    function setCheckpoint(url, strokeCount) {
+                        if (checkpointImage !== "" && checkpointImage !== url) unloadImage(checkpointImage);
+                        checkpointImage = url;
+                        checkpointStrokes = strokeCount;
+                        if (url !== "") loadImage(url);
+                    }
+
+                    onImageLoaded: redrawAll()
+                    onWidthChanged: { drawingBackend.setCanvasSize(width, height); redrawAll() }
+                    onHeightChanged: { drawingBackend.setCanvasSize(width, height); redrawAll() }
 
                     onPaint: {
                         var ctx = getContext("2d")
-                        ctx.clearRect(0, 0, width, height)
-                        if (isImageLoaded(imageToLoad)) {
-                            ctx.drawImage(imageToLoad, 0, 0)
+                        if (fullRepaint) {
+                            if (checkpointImage !== "") {
+                                // Ждём растр контрольной точки (onImageLoaded), чтобы не мигать
+                                if (!isImageLoaded(checkpointImage)) return
+                                ctx.clearRect(0, 0, width, height)
+                                ctx.drawImage(checkpointImage, 0, 0)
+                                paintedStrokes = checkpointStrokes
+                            } else {
+                                ctx.clearRect(0, 0, width, height)
+                                if (isImageLoaded(imageToLoad)) {
+                                    ctx.drawImage(imageToLoad, 0, 0)
+                                }
+                                paintedStrokes = 0
+                            }
+                            fullRepaint = false
                         }
-                        for (var i = 0; i < strokes.length; i++) {
-                            var stroke = strokes[i];
-                            ctx.strokeStyle = stroke.color; ctx.lineWidth = stroke.width; ctx.lineCap = "round";
-                            ctx.beginPath(); ctx.moveTo(stroke.points[0].x, stroke.points[0].y);
-                            for (var j = 1; j < stroke.points.length; j++) { ctx.lineTo(stroke.points[j].x, stroke.points[j].y); }
-                            ctx.stroke();
+                        for (var i = paintedStrokes; i < strokes.length; i++) {
+                            drawStroke(ctx, strokes[i].color, strokes[i].width, strokes[i].points, 0)
                         }
-                        if (isDrawing && currentStrokePoints.length > 0) {
-                            ctx.strokeStyle = currentColor; ctx.lineWidth = lineWidth; ctx.lineCap = "round";
-                            ctx.beginPath(); ctx.moveTo(currentStrokePoints[0].x, currentStrokePoints[0].y);
-                            for (var k = 1; k < currentStrokePoints.length; k++) { ctx.lineTo(currentStrokePoints[k].x, currentStrokePoints[k].y); }
-                            ctx.stroke();
+                        paintedStrokes = strokes.length
+                    }
+
+                    // Слой текущего штриха: за кадр дорисовываются только новые сегменты
+                    Canvas {
+                        id: liveLayer
+                        anchors.fill: parent
+
+                        property int drawnPoints: 0
+                        property bool clearPending: false
+
+                        function reset() {
+                            drawnPoints = 0;
+                            clearPending = true;
+                            requestPaint();
+                        }
+
+                        onPaint: {
+                            var ctx = getContext("2d")
+                            if (clearPending) {
+                                ctx.clearRect(0, 0, width, height)
+                                clearPending = false
+                            }
+                            var points = canvas.currentStrokePoints
+                            if (!canvas.isDrawing || points.length === 0) return
+                            // Начинаем с последней уже нарисованной точки, чтобы сегменты стыковались
+                            canvas.drawStroke(ctx, canvas.currentColor, canvas.lineWidth, points, drawnPoints - 1)
+                            drawnPoints = points.length
                         }
                     }
 
                     MouseArea {
                         id: mouseArea
                         anchors.fill: parent
-                        onPressed: { canvas.isDrawing = true; canvas.currentStrokePoints = [Qt.point(mouseX, mouseY)]; canvas.requestPaint(); }
-                        onPositionChanged: { if (canvas.isDrawing) { canvas.currentStrokePoints.push(Qt.point(mouseX, mouseY)); canvas.requestPaint(); } }
+                        onPressed: {
+                            canvas.isDrawing = true; canvas.currentStrokePoints = [Qt.point(mouseX, mouseY)];
+                            canvas.rawPointCount = 1;
+                            liveLayer.reset();
+                        }
+                        onPositionChanged: {
+                            if (canvas.isDrawing) {
+                                var points = canvas.currentStrokePoints;
+                                var last = points[points.length - 1];
+                                canvas.rawPointCount++;
+                                var dx = mouseX - last.x, dy = mouseY - last.y;
+                                if (dx * dx + dy * dy < canvas.minPointDistance * canvas.minPointDistance) return;
+                                points.push(Qt.point(mouseX, mouseY));
+                                liveLayer.markDirty(canvas.pointsRect(points, points.length - 2, canvas.lineWidth));
+                            }
+                        }
                         onReleased: {
                             if (canvas.isDrawing && canvas.currentStrokePoints.length > 0) {
-                                canvas.strokes.push({"color": canvas.currentColor, "width": canvas.lineWidth, "points": canvas.currentStrokePoints});
+                                var points = canvas.currentStrokePoints;
+                                var last = points[points.length - 1];
+                                if (last.x !== mouseX || last.y !== mouseY) points.push(Qt.point(mouseX, mouseY));
+                                var simplified = JSON.parse(drawingBackend.simplifyStroke(JSON.stringify(points), canvas.rawPointCount));
+                                var stroke = {"color": canvas.currentColor, "width": canvas.lineWidth, "points": simplified};
+                                canvas.commitStroke(stroke);
+                                drawingBackend.recordStroke(JSON.stringify(stroke));
                             }
-                            canvas.isDrawing = false; canvas.currentStrokePoints = []; canvas.requestPaint();
+                            canvas.isDrawing = false; canvas.currentStrokePoints = [];
+                            liveLayer.reset();
                         }
                     }
                 }
@@ -143,7 +277,7 @@ ApplicationWindow {
                 border.color: "grey"
                 ColumnLayout {
                     anchors.fill: parent; anchors.margins: 5
-                    Label { text: "История (saves.json)"; font.bold: true; Layout.alignment: Qt.AlignHCenter }
+                    Label { text: "История сохранений"; font.bold: true; Layout.alignment: Qt.AlignHCenter }
                     ListView {
                         id: historyView; Layout.fillWidth: true; Layout.fillHeight: true
                         model: drawingBackend.historyModel; delegate: historyDelegate; clip: true
@@ -171,8 +305,16 @@ ApplicationWindow {
                 }
             }
             Item { Layout.fillWidth: true }
-            Button { text: "Сохранить в историю"; onClicked: drawingBackend.saveCanvas(canvas.toDataURL()) }
-            Button { text: "Очистить"; onClicked: { canvas.strokes = []; canvas.imageToLoad = ""; canvas.requestPaint(); } }
+            Button { text: "Отменить"; enabled: drawingBackend.canUndo; onClicked: root.undo() }
+            Button { text: "Повторить"; enabled: drawingBackend.canRedo; onClicked: root.redo() }
+            Button { text: "Сохранить в историю"; onClicked: root.saveToHistory() }
+            Button {
+                text: "Очистить"
+                onClicked: {
+                    canvas.strokes = []; canvas.imageToLoad = ""; canvas.setCheckpoint("", 0); canvas.redrawAll();
+                    drawingBackend.recordClear();
+                }
+            }
         }
 
         // --- Строка статуса ---
@@ -181,7 +323,14 @@ ApplicationWindow {
             Layout.margins: 10
             Label {
                 id: statusLabel
-                text: "PNG-бэкап: autosave_backup.png (каждые 30 сек)"
+                text: root.backupStatusText()
+                font.pixelSize: 12
+                color: "gray"
+            }
+            Item { Layout.fillWidth: true }
+            Label {
+                text: "Точки штриха: " + drawingBackend.rawPointCount + " → " + drawingBackend.decimatedPointCount
+                      + " → " + drawingBackend.simplifiedPointCount
                 font.pixelSize: 12
                 color: "gray"
             }
@@ -197,7 +346,12 @@ ApplicationWindow {
                 anchors.fill: parent; anchors.margins: 2; color: "white"; border.color: "lightgrey"
                 Column {
                     anchors.fill: parent; anchors.margins: 5
-                    Image { width: parent.width; height: 90; source: "data:image/png;base64," + imageData; fillMode: Image.PreserveAspectFit }
+                    Image {
+                        width: parent.width; height: 90; fillMode: Image.PreserveAspectFit
+                        // Миниатюра генерируется провайдером в фоне и кешируется по хешу снимка
+                        source: "image://thumbnails/" + snapshotId
+                        sourceSize: Qt.size(180, 90); asynchronous: true; cache: false
+                    }
                     Text { text: timestamp; font.pixelSize: 12; anchors.horizontalCenter: parent.horizontalCenter }
                 }
                 MouseArea { anchors.fill: parent; onClicked: drawingBackend.loadSave(index) }
@@ -205,6 +359,14 @@ ApplicationWindow {
         }
     }
 
+    function backupStatusText() {
+        var text = "PNG-бэкап: autosave_backup.png (каждые 30 сек)"
+        if (drawingBackend.autosaveLatencyMs > 0) {
+            text += ", запись " + drawingBackend.autosaveLatencyMs.toFixed(1) + " мс"
+        }
+        return text
+    }
+
     // --- Функция для обновления выделения кнопок толщины ---
     function updateWidthSelection(selectedValue) {
         w1Btn.selected = (selectedValue === 1);
@@ -222,6 +384,28 @@ ApplicationWindow {
             statusLabel.text = message
             resetStatusTimer.restart()
         }
+        function onImageDataLoaded(dataUrl) {
+            canvas.strokes = []
+            canvas.setCheckpoint("", 0)
+            canvas.imageToLoad = dataUrl
+            canvas.loadImage(dataUrl)
+            canvas.redrawAll()
+        }
+        function onStrokesLoaded(strokesJson) {
+            canvas.imageToLoad = ""
+            canvas.setCheckpoint("", 0)
+            canvas.strokes = JSON.parse(strokesJson)
+            canvas.redrawAll()
+        }
+        function onCanvasStateRestored(stateJson) {
+            var state = JSON.parse(stateJson)
+            canvas.strokes = state.strokes
+            canvas.imageToLoad = state.background
+            // Фон нужен отдельно, только если его нет в растре контрольной точки
+            if (state.background !== "" && state.checkpoint === "") canvas.loadImage(state.background)
+            canvas.setCheckpoint(state.checkpoint, state.checkpointStrokes)
+            canvas.redrawAll()
+        }
     }
 
     // Таймер для сброса текста статуса
@@ -229,7 +413,8 @@ ApplicationWindow {
         id: resetStatusTimer
         interval: 5000
         onTriggered: {
-            statusLabel.text = "PNG-бэкап: autosave_backup.png (каждые 30 сек)"
+            // Восстанавливаем привязку, чтобы время записи бэкапа снова обновлялось
+            statusLabel.text = Qt.binding(root.backupStatusText)
         }
     }
 }
\ No newline at end of file
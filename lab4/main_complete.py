@@ -2,95 +2,290 @@ import sys
 import json
 import base64
 import os
+import zlib
 from datetime import datetime
 
 from PyQt5.QtCore import QObject, pyqtSlot, pyqtSignal, pyqtProperty, QAbstractListModel, Qt, QModelIndex
-from PyQt5.QtGui import QGuiApplication
+from PyQt5.QtGui import QGuiApplication, QImage
 from PyQt5.QtQml import QQmlApplicationEngine
 
+from snapshot_store import SnapshotStore
+from thumbnail_provider import ThumbnailProvider
+from stroke_codec import encode_strokes, decode_strokes
+from stroke_processing import simplify_rdp
+from autosave_writer import AutosaveWriter
+from snapshot_tiles import store_tiled, load_snapshot_image, image_to_png, snapshot_references
+from undo_engine import UndoEngine, CanvasImageProvider
+
+HISTORY_DIR = "C:/Users/USER/PycharmProjects/image"
+# Хранение истории: число снимков и возраст в днях (None - без ограничения)
+HISTORY_MAX_ENTRIES = 500
+HISTORY_MAX_AGE_DAYS = None
+# Память под журнал отмены (команды и растровые контрольные точки), байт
+UNDO_MEMORY_BUDGET = 64 * 1024 * 1024
+
 # --- Модель для отображения истории сохранений в QML ---
 class SaveHistoryModel(QAbstractListModel):
     TimestampRole = Qt.UserRole + 1
-    ImageDataRole = Qt.UserRole + 2
+    SnapshotIdRole = Qt.UserRole + 2
+    # Сколько строк отдаётся представлению за один fetchMore
+    PAGE_SIZE = 50
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._saves = []
+        self._saves = []    # только метаданные, новые первыми
+        self._loaded = 0    # строки, уже отданные представлению
 
     def data(self, index, role=Qt.DisplayRole):
-        if 0 <= index.row() < len(self._saves):
+        if 0 <= index.row() < self._loaded:
             save = self._saves[index.row()]
             if role == SaveHistoryModel.TimestampRole:
                 return save["timestamp"]
-            if role == SaveHistoryModel.ImageDataRole:
-                return save["imageData"]
+            if role == SaveHistoryModel.SnapshotIdRole:
+                return save["hash"]
         return None
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._saves)
+        return self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self._loaded < len(self._saves)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Следующая страница строк; миниатюры запрашиваются только для отданных строк"""
+        count = min(self.PAGE_SIZE, len(self._saves) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
 
     def roleNames(self):
         return {
             SaveHistoryModel.TimestampRole: b"timestamp",
-            SaveHistoryModel.ImageDataRole: b"imageData",
+            SaveHistoryModel.SnapshotIdRole: b"snapshotId",
         }
 
-    def add_save(self, timestamp, image_data):
+    def add_save(self, timestamp, snapshot_hash):
         self.beginInsertRows(QModelIndex(), 0, 0)
-        self._saves.insert(0, {"timestamp": timestamp, "imageData": image_data})
+        self._saves.insert(0, {"timestamp": timestamp, "hash": snapshot_hash})
+        self._loaded += 1
         self.endInsertRows()
 
+    def set_saves(self, entries):
+        """Загрузка всей истории одним сбросом модели (entries - от старых к новым)"""
+        self.beginResetModel()
+        self._saves = [{"timestamp": entry["timestamp"], "hash": entry["hash"]} for entry in reversed(entries)]
+        self._loaded = min(self.PAGE_SIZE, len(self._saves))
+        self.endResetModel()
+
     def get_save(self, index):
-        if 0 <= index < len(self._saves):
+        if 0 <= index < self._loaded:
             return self._saves[index]
         return None
 
     def clear(self):
         self.beginResetModel()
         self._saves = []
+        self._loaded = 0
         self.endResetModel()
 
 # --- Основной класс-контроллер ---
 class DrawingBackend(QObject):
     imageDataLoaded = pyqtSignal(str)
+    strokesLoaded = pyqtSignal(str)  # JSON-список штрихов для canvas.strokes
     saveStatusChanged = pyqtSignal(str) # Сигнал для отображения статуса в UI
+    strokeStatsChanged = pyqtSignal()
+    simplifyToleranceChanged = pyqtSignal()
+    autosaveLatencyChanged = pyqtSignal()
+    # JSON состояния холста после отмены/повтора: strokes, background, checkpoint, checkpointStrokes
+    canvasStateRestored = pyqtSignal(str)
+    undoStateChanged = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, history_dir=HISTORY_DIR, max_entries=HISTORY_MAX_ENTRIES,
+                 max_age_days=HISTORY_MAX_AGE_DAYS, undo_memory_budget=UNDO_MEMORY_BUDGET):
         super().__init__()
         self._history_model = SaveHistoryModel()
-        self._save_file_path = "C:/Users/USER/PycharmProjects/image/saves.json"
-        self._autosave_png_path = "C:/Users/USER/PycharmProjects/image/autosave_backup.png"
+        self._max_entries = max_entries
+        self._max_age_days = max_age_days
+        # saves.json - старый формат истории, переносится в хранилище снимков при первом запуске
+        self._save_file_path = os.path.join(history_dir, "saves.json")
+        self._autosave_png_path = os.path.join(history_dir, "autosave_backup.png")
+        self._store = SnapshotStore(history_dir, legacy_json_path=self._save_file_path,
+                                     references=snapshot_references)
+        self._thumbnail_provider = ThumbnailProvider(self._store, os.path.join(history_dir, "thumbnails"))
+        # Допуск упрощения штрихов (пиксели) и число точек последнего штриха на каждом этапе
+        self._simplify_tolerance = 0.5
+        self._raw_point_count = 0
+        self._decimated_point_count = 0
+        self._simplified_point_count = 0
+        # Запись PNG-бэкапа в отдельном потоке
+        self._autosave_latency_ms = 0.0
+        self._autosave_writer = AutosaveWriter(self._autosave_png_path)
+        self._autosave_writer.written.connect(self._on_autosave_written)
+        self._autosave_writer.failed.connect(self._on_autosave_failed)
+        # Сжатие истории тоже выполняется в потоке записи
+        self._compaction_queued = False
+        self._autosave_writer.compacted.connect(self._on_history_compacted)
+        self._autosave_writer.compaction_failed.connect(self._on_compaction_failed)
+        self._autosave_writer.start()
+        # Журнал отмены; растры контрольных точек отдаются холсту через image://canvas
+        self._undo_engine = UndoEngine(self._load_background, undo_memory_budget)
+        self._canvas_image_provider = CanvasImageProvider(self._undo_engine, self._load_background)
         self._load_history()
 
+    @property
+    def thumbnailProvider(self):
+        """Провайдер миниатюр; регистрируется в движке QML как image://thumbnails"""
+        return self._thumbnail_provider
+
+    @property
+    def canvasImageProvider(self):
+        """Провайдер растров для холста; регистрируется в движке QML как image://canvas"""
+        return self._canvas_image_provider
+
     @pyqtProperty(QAbstractListModel, constant=True)
     def historyModel(self):
         return self._history_model
 
+    @pyqtProperty(float, notify=simplifyToleranceChanged)
+    def simplifyTolerance(self):
+        return self._simplify_tolerance
+
+    @simplifyTolerance.setter
+    def simplifyTolerance(self, value):
+        if value != self._simplify_tolerance:
+            self._simplify_tolerance = value
+            self.simplifyToleranceChanged.emit()
+
+    @pyqtProperty(float, notify=autosaveLatencyChanged)
+    def autosaveLatencyMs(self):
+        return self._autosave_latency_ms
+
+    @pyqtProperty(bool, notify=undoStateChanged)
+    def canUndo(self):
+        return self._undo_engine.can_undo
+
+    @pyqtProperty(bool, notify=undoStateChanged)
+    def canRedo(self):
+        return self._undo_engine.can_redo
+
+    @pyqtProperty(int, notify=strokeStatsChanged)
+    def rawPointCount(self):
+        return self._raw_point_count
+
+    @pyqtProperty(int, notify=strokeStatsChanged)
+    def decimatedPointCount(self):
+        return self._decimated_point_count
+
+    @pyqtProperty(int, notify=strokeStatsChanged)
+    def simplifiedPointCount(self):
+        return self._simplified_point_count
+
+    @pyqtSlot(str, int, result=str)
+    def simplifyStroke(self, points_json, raw_point_count):
+        """Упрощение завершённого штриха (Рамер-Дуглас-Пекер) с допуском simplifyTolerance.
+
+        points_json - точки после прореживания в QML, raw_point_count - число событий мыши.
+        """
+        points = json.loads(points_json)
+        simplified = simplify_rdp(points, self._simplify_tolerance)
+        self._raw_point_count = raw_point_count
+        self._decimated_point_count = len(points)
+        self._simplified_point_count = len(simplified)
+        self.strokeStatsChanged.emit()
+        return json.dumps(simplified)
+
+    @pyqtSlot(int, int)
+    def setCanvasSize(self, width, height):
+        """Размер холста для растров контрольных точек"""
+        self._undo_engine.set_canvas_size(width, height)
+
+    @pyqtSlot(str)
+    def recordStroke(self, stroke_json):
+        """Завершённый штрих в журнал отмены"""
+        self._undo_engine.record({"type": "stroke", "stroke": json.loads(stroke_json)})
+        self.undoStateChanged.emit()
+
+    @pyqtSlot()
+    def recordClear(self):
+        self._undo_engine.record({"type": "clear"})
+        self.undoStateChanged.emit()
+
+    @pyqtSlot()
+    def undo(self):
+        """Отмена: восстановление ближайшей контрольной точки и короткое воспроизведение"""
+        self._emit_canvas_state(self._undo_engine.undo())
+
+    @pyqtSlot()
+    def redo(self):
+        self._emit_canvas_state(self._undo_engine.redo())
+
+    def _emit_canvas_state(self, state):
+        if state is None:
+            return
+        self.canvasStateRestored.emit(json.dumps({
+            "strokes": state["strokes"],
+            "background": f"image://canvas/snapshot/{state['background']}" if state["background"] else "",
+            "checkpoint": f"image://canvas/checkpoint/{state['checkpoint']}" if state["checkpoint"] else "",
+            "checkpointStrokes": state["checkpointStrokes"],
+        }))
+        self.undoStateChanged.emit()
+
+    def _load_background(self, snapshot_hash):
+        """Фоновый снимок для журнала отмены; None, если снимок уже удалён из истории"""
+        try:
+            return load_snapshot_image(self._store, snapshot_hash)
+        except (KeyError, IOError, ValueError, IndexError, zlib.error) as e:
+            print(f"Ошибка при загрузке снимка {snapshot_hash}: {e}")
+            return None
+
     @pyqtSlot(str)
     def saveCanvas(self, image_data_url):
-        """Ручное сохранение в историю (saves.json)."""
+        """Сохранение растрового снимка в историю: хранятся только изменившиеся плитки."""
         try:
             header, encoded = image_data_url.split(",", 1)
+            image = QImage.fromData(base64.b64decode(encoded))
+            if image.isNull():
+                raise ValueError("не удалось декодировать изображение")
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self._history_model.add_save(timestamp, encoded)
-            self._save_history_to_file()
+            entry = store_tiled(self._store, timestamp, image)
+            self._history_model.add_save(timestamp, entry["hash"])
+            self._enforce_retention()
             self.saveStatusChanged.emit(f"Сохранено в историю: {timestamp}")
-        except (ValueError, IndexError) as e:
+        except (ValueError, IndexError, IOError) as e:
             print(f"Ошибка при декодировании данных изображения: {e}")
             self.saveStatusChanged.emit(f"Ошибка сохранения: {e}")
 
+    @pyqtSlot(str, int, int)
+    def saveStrokes(self, strokes_json, width, height):
+        """Сохранение в историю векторных штрихов в компактном бинарном виде."""
+        try:
+            data = encode_strokes(json.loads(strokes_json), width, height)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            entry = self._store.append(timestamp, data, kind="strokes")
+            self._history_model.add_save(timestamp, entry["hash"])
+            self._enforce_retention()
+            self.saveStatusChanged.emit(f"Сохранено в историю: {timestamp} ({len(data)} байт)")
+        except (ValueError, KeyError, TypeError, IOError) as e:
+            print(f"Ошибка при сохранении штрихов: {e}")
+            self.saveStatusChanged.emit(f"Ошибка сохранения: {e}")
+
     @pyqtSlot(str)
     def autoSaveToPng(self, image_data_url):
-        """Автосохранение в один PNG-файл."""
-        try:
-            header, encoded = image_data_url.split(",", 1)
-            image_data = base64.b64decode(encoded)
-            with open(self._autosave_png_path, "wb") as f:
-                f.write(image_data)
-            # Можно убрать вывод в консоль, чтобы не засорять
-            # print(f"Автосохранение в {self._autosave_png_path} выполнено.")
-        except (ValueError, IndexError, IOError) as e:
-            print(f"Ошибка при автосохранении в PNG: {e}")
+        """Автосохранение в один PNG-файл: декодирование и запись идут в фоновом потоке."""
+        self._autosave_writer.submit(image_data_url)
+
+    def _on_autosave_written(self, latency_ms):
+        self._autosave_latency_ms = latency_ms
+        self.autosaveLatencyChanged.emit()
+
+    def _on_autosave_failed(self, message):
+        print(f"Ошибка при автосохранении в PNG: {message}")
+
+    def shutdown(self):
+        """Дописывает ожидающий PNG-бэкап перед выходом из приложения"""
+        self._autosave_writer.stop()
 
     @pyqtSlot(int)
     def setAutoSaveInterval(self, interval_seconds):
@@ -105,36 +300,91 @@ class DrawingBackend(QObject):
         """Загружает выбранное сохранение из истории."""
         save_data = self._history_model.get_save(index)
         if save_data:
-            self.imageDataLoaded.emit(f"data:image/png;base64,{save_data['imageData']}")
+            # Полное изображение читается и кодируется только здесь
+            try:
+                if self._store.kind(save_data["hash"]) == "strokes":
+                    strokes, width, height = decode_strokes(self._store.read(save_data["hash"]))
+                    self._undo_engine.record({"type": "load", "background": None, "strokes": strokes})
+                    self.undoStateChanged.emit()
+                    self.strokesLoaded.emit(json.dumps(strokes))
+                    return
+                if self._store.kind(save_data["hash"]) == "tiles":
+                    # Снимок собирается из плиток только при загрузке
+                    data = image_to_png(load_snapshot_image(self._store, save_data["hash"]))
+                else:
+                    data = self._store.read(save_data["hash"])
+            except (KeyError, IOError, ValueError, IndexError, zlib.error) as e:
+                print(f"Ошибка при загрузке сохранения: {e}")
+                return
+            self._undo_engine.record({"type": "load", "background": save_data["hash"]})
+            self.undoStateChanged.emit()
+            encoded = base64.b64encode(data).decode("ascii")
+            self.imageDataLoaded.emit(f"data:image/png;base64,{encoded}")
+
+    @pyqtSlot()
+    def compactHistory(self):
+        """Применяет ограничения хранения и переписывает pack-файл без неиспользуемых блоков.
+
+        Сжатие выполняется в потоке записи; сохранения в это время продолжаются,
+        модель истории обновляется по сигналу compacted.
+        """
+        if self._compaction_queued:
+            return
+        self._compaction_queued = True
+        self._autosave_writer.submit_compaction(self._compact_store)
+
+    def _compact_store(self):
+        # Выполняется в потоке записи
+        if not self._store.apply_retention(self._max_entries, self._max_age_days, snapshot_references):
+            self._store.compact(references=snapshot_references)
+
+    def _on_history_compacted(self):
+        self._compaction_queued = False
+        self._reload_model()
+        self.saveStatusChanged.emit(f"История сжата: {len(self._store.entries)} сохранений")
+
+    def _on_compaction_failed(self, message):
+        self._compaction_queued = False
+        print(f"Ошибка при сжатии истории: {message}")
+
+    def _enforce_retention(self):
+        # Сжатие с запасом, чтобы не переписывать историю после каждого сохранения
+        slack = max(10, (self._max_entries or 0) // 10)
+        if self._max_entries is not None and len(self._store.entries) > self._max_entries + slack:
+            self.compactHistory()
+
+    def _reload_model(self):
+        self._history_model.set_saves(self._store.entries)
+        self._thumbnail_provider.prune(entry["hash"] for entry in self._store.entries)
 
     def _load_history(self):
-        if os.path.exists(self._save_file_path):
-            try:
-                with open(self._save_file_path, 'r') as f:
-                    data = json.load(f)
-                    self._history_model.clear()
-                    for item in reversed(data):
-                        self._history_model.add_save(item['timestamp'], item['imageData'])
-                print("История сохранений из saves.json загружена.")
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Ошибка при чтении файла истории: {e}")
-
-    def _save_history_to_file(self):
-        data_to_save = self._history_model._saves[:50]
         try:
-            with open(self._save_file_path, 'w') as f:
-                json.dump(data_to_save, f, indent=2)
-        except IOError as e:
-            print(f"Ошибка при записи в файл истории: {e}")
+            self._store.apply_retention(self._max_entries, self._max_age_days, snapshot_references)
+        except (KeyError, ValueError, IOError) as e:
+            print(f"Ошибка при применении ограничений истории: {e}")
+        self._reload_model()
+        print("История сохранений загружена.")
 
 
 if __name__ == "__main__":
+    slot_profiler = None
+    if os.environ.get("GUI_PROFILE"):
+        # Общий профилировщик слотов (gui_profiler.py в корне репозитория)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+        from gui_profiler import install_from_env
+        slot_profiler = install_from_env(DrawingBackend)
+
     sys.argv += ['--style', 'material']
     app = QGuiApplication(sys.argv)
+    if slot_profiler is not None:
+        slot_profiler.start()
 
     engine = QQmlApplicationEngine()
     backend = DrawingBackend()
     engine.rootContext().setContextProperty("drawingBackend", backend)
+    engine.addImageProvider("thumbnails", backend.thumbnailProvider)
+    engine.addImageProvider("canvas", backend.canvasImageProvider)
+    app.aboutToQuit.connect(backend.shutdown)
 
     engine.load(os.path.join(os.path.dirname(__file__), "mainWindow.qml"))
 
@@ -0,0 +1,230 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- Хранилище снимков: pack-файл с сырыми байтами + append-only индекс ---
+class SnapshotStore:
+    PACK_NAME = "snapshots.pack"
+    INDEX_NAME = "snapshots.idx"
+    # Типы снимков, данные которых ссылаются на другие блоки хранилища
+    COMPOSITE_KINDS = ("tiles",)
+
+    def __init__(self, directory, legacy_json_path=None, references=None):
+        """references(entry, data) - хеши вложенных блоков снимка (см. compact)"""
+        self._directory = directory
+        self._references = references
+        self._pack_path = os.path.join(directory, self.PACK_NAME)
+        self._index_path = os.path.join(directory, self.INDEX_NAME)
+        self._blobs = {}     # hash -> (offset, length) в pack-файле
+        self._kinds = {}     # hash -> тип снимка ("png", "strokes" или "tiles")
+        self.entries = []    # снимки в порядке создания: {"timestamp", "hash", "kind"}
+        # read() вызывается и из потока загрузчика миниатюр, compact() - из потока
+        # записи; запись и подмена pack-файла и таблицы блоков идут под этой блокировкой
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            self._migrate_legacy(legacy_json_path)
+
+    @staticmethod
+    def content_hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, 'rb') as f:
+            content = f.read()
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            # Недописанная последняя строка после сбоя: отрезаем её, иначе следующая
+            # запись продолжит эту строку и тоже будет потеряна
+            os.truncate(self._index_path, complete)
+        for line in content[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("op") == "pack":
+                # После сжатия истории индекс ссылается на новый pack-файл
+                self._pack_path = os.path.join(self._directory, record["name"])
+            elif record.get("op") == "blob":
+                self._blobs[record["hash"]] = (record["offset"], record["length"])
+            elif record.get("op") == "snapshot" and record["hash"] in self._blobs:
+                kind = record.get("kind", "png")
+                self._kinds[record["hash"]] = kind
+                self.entries.append({"timestamp": record["timestamp"], "hash": record["hash"], "kind": kind})
+        if self._references is not None:
+            self._drop_incomplete()
+
+    def _drop_incomplete(self):
+        """Снимки, вложенные блоки которых потеряны (например, плитки из недописанного индекса)"""
+        complete = {}
+        for entry in self.entries:
+            if entry["kind"] not in self.COMPOSITE_KINDS or entry["hash"] in complete:
+                continue
+            references = self._references(entry, self.read(entry["hash"]))
+            complete[entry["hash"]] = all(digest in self._blobs for digest in references)
+        dropped = [entry for entry in self.entries if not complete.get(entry["hash"], True)]
+        if dropped:
+            print(f"Пропущено снимков с потерянными блоками: {len(dropped)}")
+            self.entries = [entry for entry in self.entries if complete.get(entry["hash"], True)]
+
+    def _append_index(self, records):
+        with open(self._index_path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _write_blob(self, data):
+        """Запись байтов в pack-файл (один раз на содержимое). Возвращает хеш и записи индекса."""
+        digest = self.content_hash(data)
+        if digest in self._blobs:
+            return digest, []
+        with open(self._pack_path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        self._blobs[digest] = (offset, len(data))
+        return digest, [{"op": "blob", "hash": digest, "offset": offset, "length": len(data)}]
+
+    def put_blob(self, data):
+        """Запись отдельного блока (например, плитки) без создания снимка"""
+        with self._lock:
+            digest, records = self._write_blob(data)
+            if records:
+                self._append_index(records)
+            return digest
+
+    def append(self, timestamp, data, kind="png"):
+        """Добавление снимка: O(размер снимка), независимо от длины истории."""
+        with self._lock:
+            digest, records = self._write_blob(data)
+            records.append({"op": "snapshot", "timestamp": timestamp, "hash": digest, "kind": kind})
+            self._append_index(records)
+            self._kinds[digest] = kind
+            entry = {"timestamp": timestamp, "hash": digest, "kind": kind}
+            self.entries.append(entry)
+            return entry
+
+    def kind(self, digest):
+        return self._kinds.get(digest, "png")
+
+    def read(self, digest):
+        # Путь, смещение и длина берутся из одного состояния, и старый pack-файл
+        # не удаляется, пока из него читают
+        with self._lock:
+            offset, length = self._blobs[digest]
+            with open(self._pack_path, 'rb') as f:
+                f.seek(offset)
+                return f.read(length)
+
+    def apply_retention(self, max_entries=None, max_age_days=None, references=None):
+        """Удаление старых снимков по числу и возрасту. Возвращает True, если история сжата."""
+        with self._lock:
+            kept = self.entries
+            if max_age_days is not None:
+                border = (datetime.now() - timedelta(days=max_age_days)).strftime(TIMESTAMP_FORMAT)
+                kept = [entry for entry in kept if entry["timestamp"] >= border]
+            if max_entries is not None and len(kept) > max_entries:
+                kept = kept[-max_entries:]
+            if len(kept) == len(self.entries):
+                return False
+            since = len(self.entries), set(self._blobs)
+        self._compact(list(kept), references, *since)
+        return True
+
+    def compact(self, entries=None, references=None):
+        """Перезапись истории: в новый pack-файл попадают только блоки оставленных снимков.
+
+        references(entry, data) возвращает хеши вложенных блоков снимка (например, плиток).
+        Новый индекс подменяет старый через os.replace, поэтому сбой на любом шаге
+        оставляет историю в прежнем или в новом, но целостном состоянии.
+
+        Может выполняться в фоновом потоке, пока GUI-поток добавляет снимки: блоки
+        копируются без блокировки, а снимки и блоки, записанные за это время,
+        дописываются под блокировкой непосредственно перед подменой индекса.
+        Сжатия не должны пересекаться между собой (их выполняет один поток).
+        """
+        with self._lock:
+            entries = list(self.entries if entries is None else entries)
+            since = len(self.entries), set(self._blobs)
+        self._compact(entries, references, *since)
+
+    def _compact(self, entries, references, known_count, known_blobs):
+        generation = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        pack_name = f"snapshots.{generation}.pack"
+        new_pack_path = os.path.join(self._directory, pack_name)
+
+        blobs = {}
+        records = [{"op": "pack", "name": pack_name}]
+
+        def copy_blob(pack, digest):
+            if digest in blobs:
+                return None
+            data = self.read(digest)
+            blobs[digest] = (pack.tell(), len(data))
+            pack.write(data)
+            records.append({"op": "blob", "hash": digest, "offset": blobs[digest][0], "length": len(data)})
+            return data
+
+        def write_pack(mode, entries, digests=()):
+            try:
+                with open(new_pack_path, mode) as pack:
+                    for digest in digests:
+                        copy_blob(pack, digest)
+                    for entry in entries:
+                        data = copy_blob(pack, entry["hash"])
+                        if data is not None and references is not None:
+                            for digest in references(entry, data):
+                                copy_blob(pack, digest)
+                        records.append({"op": "snapshot", "timestamp": entry["timestamp"],
+                                        "hash": entry["hash"], "kind": entry["kind"]})
+                    pack.flush()
+                    os.fsync(pack.fileno())
+            except (KeyError, IOError):
+                # Индекс ещё не подменён - история остаётся прежней, недописанный pack не нужен
+                os.remove(new_pack_path)
+                raise
+
+        write_pack('wb', entries)
+        with self._lock:
+            # Добавленное во время копирования: снимки и блоки (например, плитки
+            # снимка, который ещё не дописан в индекс)
+            late_entries = self.entries[known_count:]
+            write_pack('ab', late_entries, [digest for digest in self._blobs if digest not in known_blobs])
+            entries += late_entries
+
+            temp_index_path = self._index_path + ".tmp"
+            with open(temp_index_path, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            os.replace(temp_index_path, self._index_path)
+
+            old_pack_path = self._pack_path
+            self._pack_path = new_pack_path
+            self._blobs = blobs
+            self._kinds = {entry["hash"]: entry["kind"] for entry in entries}
+            self.entries = list(entries)
+            if old_pack_path != new_pack_path and os.path.exists(old_pack_path):
+                os.remove(old_pack_path)
+
+    def _migrate_legacy(self, json_path):
+        """Однократный перенос истории из старого saves.json (base64 в JSON)."""
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            # В saves.json новые сохранения идут первыми
+            items = [(item['timestamp'], base64.b64decode(item['imageData'])) for item in reversed(data)]
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"Ошибка при переносе истории из {json_path}: {e}")
+            return
+        for timestamp, image_bytes in items:
+            self.append(timestamp, image_bytes)
+        os.replace(json_path, json_path + ".migrated")
+        print(f"История из {json_path} перенесена в {self._index_path}.")
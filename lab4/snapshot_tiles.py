@@ -0,0 +1,81 @@
+import struct
+import zlib
+
+from PyQt5.QtCore import QBuffer, QIODevice
+from PyQt5.QtGui import QImage, QPainter
+
+from stroke_codec import decode_strokes, render_strokes
+
+# --- Растровые снимки как манифесты плиток ---
+# Изображение режется на плитки TILE_SIZE x TILE_SIZE; каждая плитка (сжатые zlib
+# пиксели ARGB32) хранится в SnapshotStore один раз по хешу содержимого, а снимок -
+# это манифест: MAGIC, ширина, высота, размер плитки и хеши плиток построчно.
+TILE_SIZE = 64
+MAGIC = b"TIL1"
+IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+
+def _tile_bytes(image, x, y, width, height):
+    tile = image.copy(x, y, width, height)
+    return tile.constBits().asstring(tile.sizeInBytes())
+
+
+def store_tiled(store, timestamp, image):
+    """Сохранение QImage в виде манифеста плиток; записываются только новые плитки"""
+    image = image.convertToFormat(IMAGE_FORMAT)
+    width, height = image.width(), image.height()
+    manifest = bytearray(MAGIC)
+    manifest += struct.pack("<III", width, height, TILE_SIZE)
+    for y in range(0, height, TILE_SIZE):
+        for x in range(0, width, TILE_SIZE):
+            raw = _tile_bytes(image, x, y, min(TILE_SIZE, width - x), min(TILE_SIZE, height - y))
+            digest = store.put_blob(zlib.compress(raw, 1))
+            manifest += bytes.fromhex(digest)
+    return store.append(timestamp, bytes(manifest), kind="tiles")
+
+
+def assemble_tiled(store, manifest):
+    """Восстановление QImage из манифеста плиток"""
+    if manifest[:len(MAGIC)] != MAGIC:
+        raise ValueError("Неизвестный формат манифеста плиток")
+    width, height, tile_size = struct.unpack_from("<III", manifest, len(MAGIC))
+    pos = len(MAGIC) + 12
+    image = QImage(width, height, IMAGE_FORMAT)
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode_Source)
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            digest = manifest[pos:pos + 32].hex()
+            pos += 32
+            tile_width, tile_height = min(tile_size, width - x), min(tile_size, height - y)
+            raw = zlib.decompress(store.read(digest))
+            painter.drawImage(x, y, QImage(raw, tile_width, tile_height, tile_width * 4, IMAGE_FORMAT))
+    painter.end()
+    return image
+
+
+def snapshot_references(entry, data):
+    """Хеши плиток, на которые ссылается снимок (для сжатия истории)"""
+    if entry["kind"] != "tiles":
+        return []
+    pos = len(MAGIC) + 12
+    return [data[i:i + 32].hex() for i in range(pos, len(data), 32)]
+
+
+def load_snapshot_image(store, digest):
+    """Полное изображение снимка любого типа: png, strokes или tiles"""
+    data = store.read(digest)
+    kind = store.kind(digest)
+    if kind == "strokes":
+        strokes, width, height = decode_strokes(data)
+        return render_strokes(strokes, width, height)
+    if kind == "tiles":
+        return assemble_tiled(store, data)
+    return QImage.fromData(data)
+
+
+def image_to_png(image):
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(buffer.data())
@@ -0,0 +1,130 @@
+import struct
+
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtGui import QImage, QPainter, QPen, QColor, QPainterPath
+
+# --- Компактный бинарный формат штрихов ---
+# Заголовок: MAGIC, ширина и высота холста; далее для каждого штриха цвет (RGBA),
+# толщина и точки. Координаты квантуются с шагом 1/SCALE пикселя, первая точка
+# хранится абсолютной, остальные - приращениями; все числа - zigzag varint.
+MAGIC = b"STK1"
+SCALE = 4
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _parse_color(color):
+    """'#RRGGBB' или '#AARRGGBB' (формат QML) -> (r, g, b, a)"""
+    value = color.lstrip("#")
+    if len(value) == 8:
+        return int(value[2:4], 16), int(value[4:6], 16), int(value[6:8], 16), int(value[0:2], 16)
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16), 255
+
+
+def _format_color(r, g, b, a):
+    if a == 255:
+        return f"#{r:02x}{g:02x}{b:02x}"
+    return f"#{a:02x}{r:02x}{g:02x}{b:02x}"
+
+
+def encode_strokes(strokes, width, height):
+    """Список штрихов из QML ({color, width, points: [{x, y}]}) -> bytes"""
+    out = bytearray(MAGIC)
+    _write_varint(out, int(width))
+    _write_varint(out, int(height))
+    _write_varint(out, len(strokes))
+    for stroke in strokes:
+        out += struct.pack("4B", *_parse_color(stroke["color"]))
+        _write_varint(out, int(round(stroke["width"] * SCALE)))
+        points = stroke["points"]
+        _write_varint(out, len(points))
+        prev_x = prev_y = 0
+        for point in points:
+            x = int(round(point["x"] * SCALE))
+            y = int(round(point["y"] * SCALE))
+            _write_varint(out, _zigzag(x - prev_x))
+            _write_varint(out, _zigzag(y - prev_y))
+            prev_x, prev_y = x, y
+    return bytes(out)
+
+
+def decode_strokes(data):
+    """bytes -> (штрихи, ширина, высота)"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Неизвестный формат штрихов")
+    pos = len(MAGIC)
+    width, pos = _read_varint(data, pos)
+    height, pos = _read_varint(data, pos)
+    count, pos = _read_varint(data, pos)
+    strokes = []
+    for _ in range(count):
+        color = _format_color(*struct.unpack_from("4B", data, pos))
+        pos += 4
+        line_width, pos = _read_varint(data, pos)
+        n_points, pos = _read_varint(data, pos)
+        points = []
+        x = y = 0
+        for _ in range(n_points):
+            dx, pos = _read_varint(data, pos)
+            dy, pos = _read_varint(data, pos)
+            x += _unzigzag(dx)
+            y += _unzigzag(dy)
+            points.append({"x": x / SCALE, "y": y / SCALE})
+        strokes.append({"color": color, "width": line_width / SCALE, "points": points})
+    return strokes, width, height
+
+
+def paint_strokes(painter, strokes):
+    """Отрисовка штрихов так же, как Canvas в mainWindow.qml (круглые концы линий)"""
+    painter.setRenderHint(QPainter.Antialiasing)
+    for stroke in strokes:
+        points = stroke["points"]
+        if not points:
+            continue
+        pen = QPen(QColor(stroke["color"]), stroke["width"], Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        painter.setPen(pen)
+        path = QPainterPath(QPointF(points[0]["x"], points[0]["y"]))
+        for point in points[1:]:
+            path.lineTo(point["x"], point["y"])
+        painter.drawPath(path)
+
+
+def render_strokes(strokes, width, height, background=None):
+    """Растеризация штрихов в QImage (опционально поверх фонового изображения)"""
+    image = QImage(max(1, width), max(1, height), QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    if background is not None and not background.isNull():
+        painter.drawImage(0, 0, background)
+    paint_strokes(painter, strokes)
+    painter.end()
+    return image
@@ -0,0 +1,38 @@
+import math
+
+
+# --- Упрощение штрихов при завершении (прореживание точек выполняется в QML при рисовании) ---
+
+def _segment_distance(point, start, end):
+    """Расстояние от точки до отрезка start-end"""
+    dx = end["x"] - start["x"]
+    dy = end["y"] - start["y"]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(point["x"] - start["x"], point["y"] - start["y"])
+    t = ((point["x"] - start["x"]) * dx + (point["y"] - start["y"]) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return math.hypot(point["x"] - (start["x"] + t * dx), point["y"] - (start["y"] + t * dy))
+
+
+def simplify_rdp(points, tolerance):
+    """Упрощение ломаной алгоритмом Рамера-Дугласа-Пекера (без рекурсии)"""
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance = 0.0
+        index = first
+        for i in range(first + 1, last):
+            distance = _segment_distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+        if max_distance > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, flag in zip(points, keep) if flag]
@@ -0,0 +1,86 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QImage
+from PyQt5.QtQml import QQmlImageProviderBase
+from PyQt5.QtQuick import QQuickImageProvider
+
+from snapshot_tiles import load_snapshot_image
+
+# Размер миниатюры в списке истории по умолчанию
+THUMBNAIL_SIZE = QSize(180, 90)
+
+
+# --- Провайдер миниатюр для списка истории (image://thumbnails/<hash>) ---
+class ThumbnailProvider(QQuickImageProvider):
+    def __init__(self, store, cache_dir, memory_budget=16 * 1024 * 1024):
+        # ForceAsynchronousImageLoading: requestImage вызывается в потоке загрузчика QML, не в GUI
+        super().__init__(QQuickImageProvider.Image, QQmlImageProviderBase.ForceAsynchronousImageLoading)
+        self._store = store
+        self._cache_dir = cache_dir
+        self._memory_budget = memory_budget   # байт декодированных миниатюр в памяти
+        self._cache = OrderedDict()   # (hash, ширина, высота) -> QImage, LRU
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def requestImage(self, snapshot_id, requested_size):
+        if requested_size.isValid() and not requested_size.isEmpty():
+            size = requested_size
+        else:
+            size = THUMBNAIL_SIZE
+        key = (snapshot_id, size.width(), size.height())
+
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+        if image is None:
+            image = self._load_thumbnail(snapshot_id, size)
+            if image is None:
+                # Заглушка не кешируется: при следующем запросе снимок читается снова
+                image = QImage(size, QImage.Format_ARGB32_Premultiplied)
+                image.fill(Qt.transparent)
+                return image, image.size()
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = image
+                    self._cached_bytes += image.sizeInBytes()
+                while self._cached_bytes > self._memory_budget and len(self._cache) > 1:
+                    evicted_key, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= evicted.sizeInBytes()
+        return image, image.size()
+
+    def prune(self, keep_ids):
+        """Удаление из кеша (в памяти и на диске) миниатюр снимков, которых больше нет"""
+        keep_ids = set(keep_ids)
+        with self._lock:
+            for key in [key for key in self._cache if key[0] not in keep_ids]:
+                self._cached_bytes -= self._cache.pop(key).sizeInBytes()
+        for name in os.listdir(self._cache_dir):
+            if name.split("_", 1)[0] not in keep_ids:
+                try:
+                    os.remove(os.path.join(self._cache_dir, name))
+                except OSError:
+                    pass
+
+    def _load_thumbnail(self, snapshot_id, size):
+        """Миниатюра из дискового кеша или из хранилища; None, если снимок не прочитан"""
+        cache_path = os.path.join(self._cache_dir, f"{snapshot_id}_{size.width()}x{size.height()}.png")
+        image = QImage(cache_path) if os.path.exists(cache_path) else QImage()
+        if not image.isNull():
+            return image
+
+        try:
+            full_image = load_snapshot_image(self._store, snapshot_id)
+        except (KeyError, IOError, ValueError, IndexError, zlib.error) as e:
+            print(f"Ошибка при загрузке миниатюры {snapshot_id}: {e}")
+            return None
+        if full_image.isNull():
+            return None
+        image = full_image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        image.save(cache_path, "PNG")
+        return image
@@ -0,0 +1,176 @@
+import itertools
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+from PyQt5.QtQuick import QQuickImageProvider
+
+from stroke_codec import render_strokes
+
+
+# --- Журнал команд холста с растровыми контрольными точками ---
+class UndoEngine:
+    """Отмена и повтор действий на холсте.
+
+    Команды: {"type": "stroke", "stroke": ...}, {"type": "clear"} и
+    {"type": "load", "background": хеш снимка или None, "strokes": [...]}.
+    Каждые CHECKPOINT_EVERY команд сохраняется растровая контрольная точка,
+    поэтому переход к любому состоянию - это восстановление ближайшей точки
+    и воспроизведение не более CHECKPOINT_EVERY команд.
+    """
+    CHECKPOINT_EVERY = 16
+
+    def __init__(self, load_background, memory_budget=64 * 1024 * 1024):
+        self._load_background = load_background   # хеш снимка -> QImage
+        self._memory_budget = memory_budget
+        self._width = 1
+        self._height = 1
+        self._commands = []
+        self._cursor = 0         # число применённых команд
+        # Номер команды -> (фон, штрихи, id растра); точка 0 - исходное состояние журнала
+        self._checkpoints = {0: (None, (), None)}
+        # id растра -> QImage; id не переиспользуются, так что URL в кеше QML не устаревают
+        self._images = {}
+        self._image_ids = itertools.count(1)
+        self._memory = 0
+
+    def set_canvas_size(self, width, height):
+        self._width = max(1, int(width))
+        self._height = max(1, int(height))
+
+    @property
+    def can_undo(self):
+        return self._cursor > 0
+
+    @property
+    def can_redo(self):
+        return self._cursor < len(self._commands)
+
+    def checkpoint_image(self, image_id):
+        return self._images.get(image_id)
+
+    def record(self, command):
+        """Новая команда; отменённые команды после курсора отбрасываются"""
+        if self._cursor < len(self._commands):
+            for position in [p for p in self._checkpoints if p > self._cursor]:
+                self._drop_checkpoint(position)
+            self._memory -= sum(self._command_size(c) for c in self._commands[self._cursor:])
+            del self._commands[self._cursor:]
+        self._commands.append(command)
+        self._memory += self._command_size(command)
+        self._cursor = len(self._commands)
+        if self._cursor % self.CHECKPOINT_EVERY == 0:
+            self._make_checkpoint(self._cursor)
+        self._enforce_budget()
+
+    def undo(self):
+        if not self.can_undo:
+            return None
+        self._cursor -= 1
+        return self.restore(self._cursor)
+
+    def redo(self):
+        if not self.can_redo:
+            return None
+        self._cursor += 1
+        return self.restore(self._cursor)
+
+    def restore(self, position):
+        """Состояние после position команд.
+
+        Возвращает фон (хеш или None), полный список штрихов, id растра контрольной
+        точки (или None) и число штрихов, уже входящих в этот растр.
+        """
+        base = max(p for p in self._checkpoints if p <= position)
+        background, strokes, image_id = self._checkpoints[base]
+        strokes = list(strokes)
+        checkpoint, checkpoint_strokes = (image_id, len(strokes)) if image_id is not None else (None, 0)
+        for command in self._commands[base:position]:
+            background, strokes = self._apply(command, background, strokes)
+            if command["type"] != "stroke":
+                # После очистки или загрузки растр контрольной точки уже не подходит
+                checkpoint, checkpoint_strokes = None, 0
+        return {
+            "background": background,
+            "strokes": strokes,
+            "checkpoint": checkpoint,
+            "checkpointStrokes": checkpoint_strokes,
+        }
+
+    @staticmethod
+    def _apply(command, background, strokes):
+        if command["type"] == "stroke":
+            strokes.append(command["stroke"])
+            return background, strokes
+        if command["type"] == "clear":
+            return None, []
+        return command.get("background"), list(command.get("strokes", []))
+
+    def _make_checkpoint(self, position):
+        """Растр состояния: предыдущая точка + штрихи, добавленные после неё"""
+        base = max(p for p in self._checkpoints if p < position)
+        background, strokes, image_id = self._checkpoints[base]
+        strokes = list(strokes)
+        painted = len(strokes) if image_id is not None else None
+        for command in self._commands[base:position]:
+            background, strokes = self._apply(command, background, strokes)
+            if command["type"] != "stroke":
+                painted = None
+
+        if painted is not None:
+            checkpoint_image = render_strokes(strokes[painted:], self._width, self._height,
+                                              background=self._images[image_id])
+        else:
+            background_image = self._load_background(background) if background is not None else None
+            checkpoint_image = render_strokes(strokes, self._width, self._height, background=background_image)
+
+        image_id = next(self._image_ids)
+        self._images[image_id] = checkpoint_image
+        self._checkpoints[position] = (background, tuple(strokes), image_id)
+        self._memory += checkpoint_image.sizeInBytes()
+
+    def _drop_checkpoint(self, position):
+        background, strokes, image_id = self._checkpoints.pop(position)
+        if image_id is not None:
+            self._memory -= self._images.pop(image_id).sizeInBytes()
+
+    @staticmethod
+    def _command_size(command):
+        """Грубая оценка памяти команды: ~64 байта на точку"""
+        if command["type"] == "stroke":
+            return 64 * len(command["stroke"]["points"])
+        return 64 * sum(len(stroke["points"]) for stroke in command.get("strokes", []))
+
+    def _enforce_budget(self):
+        """Глубина истории ограничена памятью: старейшая часть журнала отбрасывается,
+        а следующая контрольная точка становится новым началом."""
+        while self._memory > self._memory_budget:
+            positions = sorted(p for p in self._checkpoints if p > 0)
+            if not positions or positions[0] > self._cursor:
+                return
+            new_base = positions[0]
+            self._memory -= sum(self._command_size(c) for c in self._commands[:new_base])
+            del self._commands[:new_base]
+            self._cursor -= new_base
+            self._drop_checkpoint(0)
+            self._checkpoints = {p - new_base: value for p, value in self._checkpoints.items()}
+
+
+# --- Провайдер изображений холста (image://canvas/checkpoint/<id>, image://canvas/snapshot/<hash>) ---
+class CanvasImageProvider(QQuickImageProvider):
+    """Растры контрольных точек и фоновые снимки для Canvas без кодирования в data URL"""
+    def __init__(self, engine, load_background):
+        super().__init__(QQuickImageProvider.Image)
+        self._engine = engine
+        self._load_background = load_background
+
+    def requestImage(self, image_id, requested_size):
+        kind, _, key = image_id.partition("/")
+        image = None
+        if kind == "checkpoint" and key.isdigit():
+            image = self._engine.checkpoint_image(int(key))
+        elif kind == "snapshot":
+            image = self._load_background(key)
+        if image is None or image.isNull():
+            image = QImage(1, 1, QImage.Format_ARGB32_Premultiplied)
+            image.fill(Qt.transparent)
+        return image, image.size()